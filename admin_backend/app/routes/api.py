@@ -14,7 +14,7 @@ def update_endpoint():
     country_id = input_data.get('country_id')
 
     if country_id:
-        updater = DataUpdater(if_update_all=False)
+        updater = DataUpdater()
         updater.update_country(country_id)
         return jsonify(APIResponse.success(f"Country {country_id} update initiated."))
 
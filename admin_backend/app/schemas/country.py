@@ -1,4 +1,7 @@
 #无默认值
+# schema变更时递增，读模型中校验版本不一致的行会在读取时重新校验
+COUNTRY_SCHEMA_VERSION = 2
+
 country_schema = {
     'id': {'type': 'string', 'required': True, 'empty': False},
     'name': {'type': 'string', 'required': True, 'empty': False},
@@ -140,6 +143,18 @@ country_schema = {
                     }
                 }, 
                 'nullable': True
+            },
+            'neighbors': {
+                'type': 'list',
+                'required': False,
+                'schema': {
+                    'type': 'dict',
+                    'schema': {
+                        'id': {'type': 'string', 'empty': False},
+                        'name': {'type': 'string', 'empty': False}
+                    }
+                },
+                'nullable': True
             }
         }
     }
@@ -0,0 +1,302 @@
+from typing import Any, Dict, Optional
+from sqlalchemy import func
+from sqlalchemy.orm import selectinload
+from app.config import Config
+from app.models import Country, CountryReadModel
+from app.schemas.country import country_schema
+from app.utils.geometry import decode_wkb
+from app.utils.topojson import encode_feature_collection
+
+
+class CountryPayloadBuilder:
+    """国家API响应数据的构建（ORM对象 → 响应字典）"""
+
+    # 构建完整数据所需的全部关系，一次性预加载避免N+1查询
+    GEOJSON_LOADS = (selectinload(Country.geojson),)
+    STORY_SEED_LOADS = (
+        selectinload(Country.demographics),
+        selectinload(Country.education),
+        selectinload(Country.economy),
+        selectinload(Country.industries),
+        selectinload(Country.milestones),
+        selectinload(Country.events),
+        selectinload(Country.neighbors),
+    )
+    EAGER_LOADS = GEOJSON_LOADS + STORY_SEED_LOADS
+
+    # 各几何精细度对应的列（CountryGeoJSON / CountryReadModel）
+    GEOJSON_COLUMNS = {"full": "geometry_wkb", "medium": "geometry_wkb_medium", "low": "geometry_wkb_low"}
+    READ_MODEL_GEO_COLUMNS = {"full": "geo_wkb", "medium": "geo_wkb_medium", "low": "geo_wkb_low"}
+
+    # 几何部分的输出格式：geojson → geoJson字段；topojson → topoJson字段（量化+差分编码）
+    GEO_FORMATS = ("geojson", "topojson")
+
+    @staticmethod
+    def build(country: Country, selection: Optional["FieldSelection"] = None, detail: str = "full") -> Dict[str, Any]:
+        """从ORM对象构建国家数据；指定selection时只构建被请求的顶层字段"""
+        if selection is None:
+            return CountryPayloadBuilder.from_parts(
+                CountryPayloadBuilder.build_base(country),
+                CountryPayloadBuilder.format_geojson(country.geojson, detail),
+                CountryPayloadBuilder.format_story_seed(country)
+            )
+
+        data = {k: v for k, v in CountryPayloadBuilder.build_base(country).items() if selection.wants(k)}
+        if selection.wants("geoJson"):
+            data["geoJson"] = CountryPayloadBuilder.format_geojson(country.geojson, detail)
+        if selection.wants("storySeed"):
+            data["storySeed"] = CountryPayloadBuilder.format_story_seed(country)
+        return data
+
+    @staticmethod
+    def from_read_model(row: CountryReadModel, detail: str = "full", geo_format: str = "geojson") -> Dict[str, Any]:
+        """从物化读模型行组装国家数据（简化版本缺失时使用原始几何）"""
+        topology = (row.topo_json or {}).get(detail) if geo_format == "topojson" else None
+        if topology:
+            # 直接使用写入时生成的TopoJSON，无需解码WKB
+            return {**row.payload, "topoJson": topology, "storySeed": row.story_seed}
+
+        wkb = getattr(row, CountryPayloadBuilder.READ_MODEL_GEO_COLUMNS[detail]) or row.geo_wkb
+        geo_json = CountryPayloadBuilder.geojson_from_wkb(wkb, row.geo_properties)
+        data = CountryPayloadBuilder.from_parts(row.payload, geo_json, row.story_seed)
+        if geo_format == "topojson":
+            return CountryPayloadBuilder.with_topojson(data, row.country_id)
+        return data
+
+    @staticmethod
+    def with_topojson(data: Dict[str, Any], country_id: str, topology: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        """将geoJson替换为topoJson（优先使用写入时生成的结果，缺失时实时编码）"""
+        if "geoJson" not in data:
+            return data
+        data = dict(data)
+        geo_json = data.pop("geoJson")
+        data["topoJson"] = topology or encode_feature_collection(country_id, geo_json, Config.TOPOJSON_QUANTIZATION)
+        return data
+
+    @staticmethod
+    def from_parts(base: Dict[str, Any], geo_json: Optional[Dict[str, Any]], story_seed: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+        return {
+            **base,
+            "geoJson": geo_json,
+            "storySeed": story_seed
+        }
+
+    @staticmethod
+    def build_base(country: Country) -> Dict[str, Any]:
+        """国家基础字段（不含geoJson与storySeed）"""
+        return {
+            "id": country.id,
+            "name": country.name,
+            "population": country.population,
+            "capital": country.capital,
+            "location": {
+                "type": "Point",
+                "coordinates": [float(country.longitude), float(country.latitude)] if country.longitude is not None and country.latitude is not None else [None, None]
+            }
+        }
+
+    @staticmethod
+    def format_geojson(geojson_data, detail: str = "full"):
+        """格式化地理数据（按精细度选择简化版本，缺失时使用原始几何）"""
+        if not geojson_data:
+            return {"type": "FeatureCollection", "features": []}
+
+        wkb = getattr(geojson_data, CountryPayloadBuilder.GEOJSON_COLUMNS[detail]) or geojson_data.geometry_wkb
+        return CountryPayloadBuilder.geojson_from_wkb(wkb, geojson_data.properties)
+
+    @staticmethod
+    def geojson_from_wkb(wkb, properties: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+        """WKB → 单要素的FeatureCollection（只在需要GeoJSON时解码）"""
+        if wkb is None:
+            return {"type": "FeatureCollection", "features": []}
+        return {
+            "type": "FeatureCollection",
+            "features": [{"type": "Feature", "properties": properties or {}, "geometry": decode_wkb(wkb)}]
+        }
+
+    @staticmethod
+    def format_story_seed(country):
+        """格式化故事种子数据"""
+        if not country:
+            return None
+
+        return {
+            "demographics": CountryPayloadBuilder._format_demographics(country.demographics),
+            "education": CountryPayloadBuilder._format_education(country.education),
+            "environment": CountryPayloadBuilder._format_environment(country),
+            "milestones": CountryPayloadBuilder._format_milestones(country.milestones),
+            "historicalEvents": CountryPayloadBuilder._format_events(country.events),
+            "neighbors": CountryPayloadBuilder._format_neighbors(country.neighbors)
+        }
+
+    # ------------------------------
+    # 以下为内部格式化辅助方法
+    # ------------------------------
+    @staticmethod
+    def _format_demographics(demographics):
+        if not demographics:
+            return None
+        return {
+            "gender_ratio": float(demographics.gender_ratio) if demographics.gender_ratio is not None else None,
+            "urban_ratio": float(demographics.urban_ratio) if demographics.urban_ratio is not None else None,
+            "median_age": demographics.median_age
+        }
+
+    @staticmethod
+    def _format_education(education):
+        if not education:
+            return None
+        return {
+            "school_start_age": education.school_start_age,
+            "high_school_rate": float(education.high_school_rate) if education.high_school_rate is not None else None,
+            "university_rate": float(education.university_rate) if education.university_rate is not None else None
+        }
+
+    @staticmethod
+    def _format_environment(country):
+        if not country.economy:
+            return None
+        return {
+            "gdp_per_capita": float(country.economy.gdp_per_capita) if country.economy.gdp_per_capita is not None else None,
+            "internet_penetration": float(country.economy.internet_penetration) if country.economy.internet_penetration is not None else None,
+            "main_industries": [i.industry_name for i in country.industries]
+        }
+
+    @staticmethod
+    def _format_milestones(milestones):
+        if not milestones:
+            return None
+        return {
+            "avg_marriage_age": milestones.avg_marriage_age,
+            "avg_first_child_age": milestones.avg_first_child_age,
+            "life_expectancy": milestones.life_expectancy
+        }
+
+    @staticmethod
+    def _format_events(events):
+        if not events:
+            return []
+        # 按年份倒序排序
+        sorted_events = sorted(events, key=lambda x: x.event_year, reverse=True)
+        return [
+            {
+                "name": e.event_name,
+                "year": e.event_year,
+                "impact": e.impact_type
+            } for e in sorted_events
+        ]
+
+
+    @staticmethod
+    def _format_neighbors(neighbors):
+        # 陆地接壤的国家（按代码排序）
+        return [{"id": n.id, "name": n.name} for n in neighbors]
+
+
+# (id(schema), 顶层字段) -> (schema, 部分schema)
+_partial_schemas: Dict[tuple, tuple] = {}
+
+
+class FieldSelection:
+    """
+    稀疏字段集（fields=id,name,storySeed.demographics）
+    - 解析为字段树，None表示取该字段的全部内容
+    - columns()给出读模型需要查询的列，只取被请求的JSONB内容
+    """
+    BASE_FIELDS = ("id", "name", "population", "capital", "location")
+
+    def __init__(self, tree: Dict[str, Any]):
+        self.tree = tree
+
+    @classmethod
+    def parse(cls, value: str) -> "FieldSelection":
+        """解析fields参数，包含未知字段时抛出ValueError（按country_schema逐级检查，只有dict字段可以指定子字段）"""
+        tree: Dict[str, Any] = {}
+        for path in filter(None, (p.strip() for p in value.split(","))):
+            parts = path.split(".")
+            schema = country_schema
+            for part in parts:
+                rules = schema.get(part) if schema is not None else None
+                if rules is None:
+                    raise ValueError(f"Unknown field: {path}")
+                schema = rules.get("schema") if rules.get("type") == "dict" else None
+
+            node = tree
+            for i, part in enumerate(parts):
+                if i == len(parts) - 1:
+                    node[part] = None  # 叶子：取全部内容（覆盖更细的子路径）
+                elif node.get(part, {}) is None:
+                    break  # 已请求了更上层的完整字段
+                else:
+                    node = node.setdefault(part, {})
+        if not tree:
+            raise ValueError("fields must not be empty")
+        return cls(tree)
+
+    def wants(self, name: str) -> bool:
+        return name in self.tree
+
+    def schema(self, schema: Dict[str, Any]) -> Dict[str, Any]:
+        """只保留被请求顶层字段的schema（用于校验部分构建的数据）"""
+        key = (id(schema), tuple(sorted(self.tree)))
+        cached = _partial_schemas.get(key)
+        if cached is None or cached[0] is not schema:
+            # 同一组字段复用同一个dict，使编译后的校验器可以被缓存
+            cached = _partial_schemas[key] = (schema, {k: v for k, v in schema.items() if k in self.tree})
+        return cached[1]
+
+    def columns(self, detail: str = "full", geo_format: str = "geojson") -> list:
+        """读模型中需要查询的列（storySeed的子字段直接在数据库中取出对应JSONB片段）"""
+        columns = []
+        if any(self.wants(f) for f in self.BASE_FIELDS):
+            columns.append(CountryReadModel.payload.label("payload"))
+        if self.wants("geoJson") and geo_format == "topojson":
+            columns.append(CountryReadModel.topo_json[detail].label("topo_json"))
+        elif self.wants("geoJson"):
+            geo_column = getattr(CountryReadModel, CountryPayloadBuilder.READ_MODEL_GEO_COLUMNS[detail])
+            columns.append(func.coalesce(geo_column, CountryReadModel.geo_wkb).label("geo_wkb"))
+            columns.append(CountryReadModel.geo_properties.label("geo_properties"))
+        if self.wants("storySeed"):
+            story_tree = self.tree["storySeed"]
+            if story_tree is None:
+                columns.append(CountryReadModel.story_seed.label("story_seed"))
+            else:
+                columns.extend(CountryReadModel.story_seed[key].label(f"story_seed__{key}") for key in story_tree)
+        return columns
+
+    def from_row(self, row) -> Dict[str, Any]:
+        """由columns()查询得到的行组装（并裁剪）国家数据"""
+        data: Dict[str, Any] = {}
+        if "payload" in row._fields:
+            data.update(row.payload)
+        if "geo_wkb" in row._fields:
+            data["geoJson"] = CountryPayloadBuilder.geojson_from_wkb(row.geo_wkb, row.geo_properties)
+        if "topo_json" in row._fields:
+            data["topoJson"] = row.topo_json
+        if "story_seed" in row._fields:
+            data["storySeed"] = row.story_seed
+        elif self.wants("storySeed"):
+            data["storySeed"] = {key: getattr(row, f"story_seed__{key}") for key in self.tree["storySeed"]}
+        return self.apply(data)
+
+    def apply(self, data: Dict[str, Any]) -> Dict[str, Any]:
+        """按字段树裁剪完整数据（topoJson与geoJson同属几何字段）"""
+        trimmed = self._trim(data, self.tree)
+        if "topoJson" in data and self.wants("geoJson"):
+            trimmed["topoJson"] = data["topoJson"]
+        return trimmed
+
+    @staticmethod
+    def _trim(value: Any, tree: Optional[Dict[str, Any]]) -> Any:
+        if tree is None or not isinstance(value, dict):
+            return value
+        return {key: FieldSelection._trim(value[key], sub) for key, sub in tree.items() if key in value}
+
+    def eager_loads(self) -> tuple:
+        """ORM实时构建时只预加载被请求字段需要的关系"""
+        loads = ()
+        if self.wants("geoJson"):
+            loads += CountryPayloadBuilder.GEOJSON_LOADS
+        if self.wants("storySeed"):
+            loads += CountryPayloadBuilder.STORY_SEED_LOADS
+        return loads
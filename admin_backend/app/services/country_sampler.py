@@ -0,0 +1,98 @@
+import threading
+import time
+from typing import Dict, Optional, Tuple
+from sqlalchemy import func
+from app import db
+from app.config import Config
+from app.models import Country, CountryReadModel, Demographic
+from app.utils.alias_table import AliasTable
+from app.utils.logging import get_logger
+
+logger = get_logger(__name__)
+
+
+class CountrySampler:
+    """
+    按出生潜力(出生率×总人口)加权的国家抽样器
+    - 权重表只在首次抽样、数据更新(invalidate)或超过TTL时从数据库重建
+    - 每次抽样为O(1)，不访问数据库
+    """
+    DEFAULT_BIRTH_RATE = 15.0  # 出生率缺失时使用的全球平均水平(‰)
+
+    def __init__(self, ttl: Optional[float] = None):
+        # TTL保证其他进程(如后台更新任务)写入的新数据最终会被各个worker加载
+        self.ttl = Config.COUNTRY_SAMPLER_TTL if ttl is None else ttl
+        self._table: Optional[AliasTable] = None
+        self._versions: Dict[str, str] = {}
+        self._built_at = 0.0
+        self._lock = threading.Lock()
+
+    def invalidate(self):
+        """标记权重表过期，下一次抽样时重建"""
+        with self._lock:
+            self._table = None
+
+    def sample(self) -> Optional[Tuple[str, str]]:
+        """按权重随机返回 (国家代码, 数据版本)，无可用数据时返回None"""
+        table = self._get_table()
+        return table.sample() if table else None
+
+    def get_version(self, country_id: str) -> Optional[str]:
+        """返回权重表中记录的国家数据版本，不在表中时返回None"""
+        if self._get_table() is None:
+            return None
+        return self._versions.get(country_id)
+
+    def _get_table(self) -> Optional[AliasTable]:
+        table = self._table
+        if table is not None and time.monotonic() - self._built_at < self.ttl:
+            return table
+
+        with self._lock:
+            # 双重检查，避免并发请求重复构建
+            if self._table is None or time.monotonic() - self._built_at >= self.ttl:
+                self._table = self._build_table()
+                self._versions = dict(self._table.items) if self._table else {}
+                self._built_at = time.monotonic()
+            return self._table
+
+    def _build_table(self) -> Optional[AliasTable]:
+        """查询国家人口与出生率并构建别名表"""
+        adjusted_birth_rate = func.coalesce(Demographic.birth_rate, self.DEFAULT_BIRTH_RATE)
+        # 数据版本优先取读模型的更新时间（响应内容实际来自读模型）
+        data_version = func.coalesce(CountryReadModel.updated_at, Country.updated_at)
+        countries_data = db.session.query(
+            Country.id,
+            Country.population,
+            data_version.label('updated_at'),
+            adjusted_birth_rate.label('adjusted_birth_rate')
+        ).outerjoin(  # 使用outerjoin确保即使没有demographics记录也能查询到国家
+            Demographic,
+            Country.id == Demographic.country_id
+        ).outerjoin(
+            CountryReadModel,
+            Country.id == CountryReadModel.country_id
+        ).filter(
+            Country.population > 0,
+            adjusted_birth_rate > 0
+        ).all()
+
+        if not countries_data:
+            logger.warning("No country data available for weighted sampling")
+            return None
+
+        # 权重：出生率(‰) × 总人口(人) → 以万为单位避免数值过大
+        weights = [(float(item.adjusted_birth_rate) / 1000) * item.population / 10000 for item in countries_data]
+        logger.info(f"Built birth-weight alias table for {len(countries_data)} countries")
+        # 数据版本随抽样结果一起返回，供响应缓存作为键使用
+        entries = [(item.id, self.format_version(item.updated_at)) for item in countries_data]
+        return AliasTable(entries, weights)
+
+    @staticmethod
+    def format_version(updated_at) -> str:
+        """将更新时间转换为数据版本字符串"""
+        return str(updated_at) if updated_at else "0"
+
+
+# 进程内共享的抽样器实例
+country_sampler = CountrySampler()
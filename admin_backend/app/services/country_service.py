@@ -30,6 +30,7 @@ class CountryService:
             print(f"Status: {result['status']}")
             print(f"Total Countries: {result['total']}")
             print(f"Updated Successfully: {result['updated']}")
+            print(f"Skipped (unchanged): {result.get('skipped', 0)}")
             print(f"Failed: {result['failed']}")
 
             # 如果有失败的国家，打印详细信息
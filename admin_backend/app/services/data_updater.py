@@ -1,20 +1,37 @@
-from typing import Dict, List, Any, Optional
+from typing import Dict, List, Any, Optional, Tuple
 from sqlalchemy.orm import Session
-from sqlalchemy import update, insert, delete
+from sqlalchemy import update, insert, delete, func, or_
+from sqlalchemy.dialects.postgresql import insert as pg_insert
 from sqlalchemy.exc import SQLAlchemyError
+import shapely
+from shapely.strtree import STRtree
+from app.utils.async_fetch import AsyncFetcher, host_of
+from app.utils.http_transport import http_transport
 from app.utils.logging import get_logger
-from app.models import Country, CountryGeoJSON, Demographic, Economy
-from app.utils.data_utils import parse_decimal, normalize_country_code
+from app.models import Country, CountryDataHash, CountryGeoJSON, CountryNeighbor, CountryReadModel, Demographic, Economy, WorldTopology
+from app.utils.data_utils import content_hash, parse_decimal, normalize_country_code
+from app.utils.validator import RequestValidator
+from app.utils.geometry import DETAIL_TOLERANCES, GEOMETRY_DETAILS, encode_wkb_variants, to_polygonal
+from app.utils.topojson import encode_feature_collection, encode_topology
+from app.config import Config
+from app.schemas.country import country_schema, COUNTRY_SCHEMA_VERSION
 from .restcountries import RestCountriesSource
 from .worldbank import WorldBankSource
 from .naturalearth import NaturalEarthSource
+from .country_sampler import country_sampler
+from .country_payload import CountryPayloadBuilder
+from .update_pipeline import UpdatePipeline
+import asyncio
 import time
+from datetime import datetime
 from app import db
 
 logger = get_logger(__name__)
 
 class DataUpdater:
-    def __init__(self, batch_size: int = 50, if_update_all: bool = True):
+    HASHED_SOURCES = ("base", "worldbank", "geometry")  # 计算内容哈希的数据源（CountryDataHash的列）
+
+    def __init__(self, batch_size: int = 50):
         self.batch_size = batch_size  # 批量处理大小
         self.sources = {
             "restcountries": RestCountriesSource(),
@@ -23,7 +40,10 @@ class DataUpdater:
         }
         # 存储已处理国家代码，避免重复处理
         self.processed_countries = set()
-        self.if_update_all = if_update_all
+        # 批量更新时预取的世界银行数据 {国家代码: 数据}，为空时逐国请求
+        self.worldbank_bulk: Dict[str, Dict[str, Any]] = {}
+        # 批量更新开始时读取的各国数据源内容哈希 {国家代码: {数据源: 哈希}}
+        self.data_hashes: Dict[str, Dict[str, Optional[str]]] = {}
 
     # ------------------------------
     # 批量更新所有国家数据（核心接口）
@@ -35,41 +55,46 @@ class DataUpdater:
             "total": 0,
             "updated": 0,
             "failed": 0,
+            "skipped": 0,  # 所有数据源内容均未变化、未写库的国家数
+            "skipped_sources": {source: 0 for source in self.HASHED_SOURCES},  # 各数据源未变化的次数
             "failed_countries": [],
             "start_time": time.strftime("%Y-%m-%d %H:%M:%S")
         }
 
         try:
-            # 1. 获取所有国家基础信息（作为国家列表来源）
-            logger.info("Fetching all countries list from REST Countries...")
-            all_countries = self.sources["restcountries"].fetch_data()  # 获取所有国家列表
-            if not isinstance(all_countries, list):
-                raise ValueError("Failed to get country list")
+            # 外部请求共享一个总时限：数据源不可用时尽快失败，而不是让更新拖上数小时
+            with http_transport.deadline(Config.UPDATE_DEADLINE):
+                # 1. 获取所有国家基础信息（作为国家列表来源）
+                logger.info("Fetching all countries list from REST Countries...")
+                all_countries = self.sources["restcountries"].fetch_data()  # 获取所有国家列表
+                if not isinstance(all_countries, list):
+                    raise ValueError("Failed to get country list")
             
-            result["total"] = len(all_countries)
-            logger.info(f"Found {len(all_countries)} countries to process")
-
-            # 2. 批量处理国家数据（按批次）
-            for i in range(0, len(all_countries), self.batch_size):
-                batch = all_countries[i:i+self.batch_size]
-                batch_result = self._process_country_batch(batch)
-                
-                # 更新统计结果
-                result["updated"] += batch_result["updated"]
-                result["failed"] += batch_result["failed"]
-                result["failed_countries"].extend(batch_result["failed_countries"])
-                
-                logger.info(f"Processed batch {i//self.batch_size + 1}/"
-                          f"{(len(all_countries)-1)//self.batch_size + 1} "
-                          f"| Updated: {batch_result['updated']} | Failed: {batch_result['failed']}")
+                result["total"] = len(all_countries)
+                logger.info(f"Found {len(all_countries)} countries to process")
+
+                # 世界银行数据按指标批量获取（每个指标一次country/all请求），失败时回退到逐国请求
+                self.worldbank_bulk = self.sources["worldbank"].fetch_all()
+                if not self.worldbank_bulk:
+                    logger.warning("World Bank bulk fetch failed, falling back to per-country requests")
+
+                # 2. 流水线处理：并发抓取 → 几何编码 → 按批写库（每批一个事务），三个阶段同时进行
+                result["stage_timings"] = self._run_update_pipeline(all_countries, result)
+
+            unavailable = http_transport.open_circuits()
+            if unavailable:
+                logger.warning(f"Upstream hosts unavailable during update: {', '.join(unavailable)}")
+                result["unavailable_hosts"] = unavailable
+
+            # 3. 全部国家更新完成后计算邻接关系（邻国变化的国家需要重建读模型）与世界TopoJSON
+            for country_code in self.refresh_country_neighbors():
+                self._refresh_read_model(country_code)
+            self.refresh_world_topology()
 
             result["status"] = "completed"
             result["end_time"] = time.strftime("%Y-%m-%d %H:%M:%S")
             logger.info(f"Batch update completed. Total: {result['total']}, "
-                      f"Updated: {result['updated']}, Failed: {result['failed']}")
-            
-            print("清理临时文件...")
-            self.sources["naturalearth"]._cleanup_temp_files()
+                      f"Updated: {result['updated']}, Skipped: {result['skipped']}, Failed: {result['failed']}")
 
         except Exception as e:
             logger.error(f"Batch update failed: {str(e)}", exc_info=True)
@@ -79,51 +104,221 @@ class DataUpdater:
 
         return result
 
-    def _process_country_batch(self, batch: List[Dict]) -> Dict[str, Any]:
-        """处理单个国家批次（提高效率）"""
-        batch_result = {"updated": 0, "failed": 0, "failed_countries": []}
-        
-        for country in batch:
+    def _run_update_pipeline(self, countries: List[Dict], result: Dict[str, Any]) -> Dict[str, Dict[str, float]]:
+        """用fetch → transform → write流水线处理国家列表，统计结果写入result，返回各阶段计时"""
+        pending, seen = [], set()
+        for country in countries:
             country_code = country.get("id")
-            if not country_code or country_code in self.processed_countries:
+            if country_code and country_code not in self.processed_countries and country_code not in seen:
+                seen.add(country_code)
+                pending.append(country)
+
+        # 上次写入的各数据源内容哈希，transform阶段据此跳过未变化的数据
+        self.data_hashes = {
+            row.country_id: {source: getattr(row, source) for source in self.HASHED_SOURCES}
+            for row in db.session.query(CountryDataHash)
+        }
+        db.session.commit()  # 结束只读事务，之后按批写入
+
+        total_batches = (len(pending) - 1) // self.batch_size + 1
+        batches_done = 0
+
+        def write_batch(entries: List[Tuple[Dict[str, Any], Any]]):
+            nonlocal batches_done
+            updated, skipped = self._write_country_batch(entries, result)
+            batches_done += 1
+            logger.info(f"Processed batch {batches_done}/{total_batches} | Updated: {updated} "
+                        f"| Skipped: {skipped} | Failed: {len(entries) - updated - skipped}")
+
+        pipeline = UpdatePipeline(
+            fetch=self._fetch_country_sources,
+            transform=self._transform_country,
+            write_batch=write_batch,
+            batch_size=self.batch_size
+        )
+        return pipeline.run(pending)
+
+    async def _fetch_country_sources(self, fetcher: AsyncFetcher, country: Dict[str, Any]) -> Tuple[Any, Any]:
+        """fetch阶段：并发获取单个国家的世界银行与边界数据（按数据源主机限制并发数，避免触发API速率限制）"""
+        country_code = country["id"]
+        wb_data, geojson_data = await asyncio.gather(
+            fetcher.call(host_of(self.sources["worldbank"].BASE_URL), self._worldbank_data, country_code),
+            fetcher.call(host_of(self.sources["naturalearth"].BASE_URL), self.sources["naturalearth"].fetch_data, country_code)
+        )
+        return wb_data, geojson_data
+
+    def _transform_country(self, country: Dict[str, Any], fetched: Tuple[Any, Any]) -> Dict[str, Any]:
+        """
+        transform阶段：不依赖数据库的CPU处理
+        计算各数据源的内容哈希并与上次写入的比较；几何有变化时才编码为各精细度的WKB
+        影响输出的设置也计入哈希，设置变化后下次更新会重新写入：
+        - 基础信息：读模型随之重建，计入TopoJSON量化参数与读模型schema版本
+        - 几何：计入坐标精度与各精细度的简化容差
+        """
+        wb_data, geojson_data = fetched
+        previous = self.data_hashes.get(country["id"], {})
+        hashes = {"base": content_hash([self._country_values(country), Config.TOPOJSON_QUANTIZATION, COUNTRY_SCHEMA_VERSION])}
+        if wb_data:
+            hashes["worldbank"] = content_hash([self._demographic_values(wb_data), self._economy_values(wb_data)])
+
+        variants = None
+        if geojson_data and isinstance(geojson_data, dict) and geojson_data.get("geometry"):
+            geometry_hash = content_hash([geojson_data, Config.GEOMETRY_PRECISION, DETAIL_TOLERANCES])
+            if geometry_hash == previous.get("geometry"):
+                hashes["geometry"] = geometry_hash
+            else:
+                try:
+                    variants = encode_wkb_variants(geojson_data["geometry"], Config.GEOMETRY_PRECISION)
+                    hashes["geometry"] = geometry_hash
+                except Exception as e:
+                    logger.warning(f"Invalid geometry for {country['id']}: {str(e)}")
+
+        return {
+            "wb_data": wb_data,
+            "geojson_data": geojson_data,
+            "variants": variants,
+            # 本次未获取到的数据源沿用上次的哈希
+            "hashes": {**previous, **hashes},
+            "changed": {source for source, value in hashes.items() if previous.get(source) != value},
+            "unchanged": {source for source, value in hashes.items() if previous.get(source) == value}
+        }
+
+    def _write_country_batch(self, entries: List[Tuple[Dict[str, Any], Any]], result: Dict[str, Any]) -> Tuple[int, int]:
+        """
+        write阶段：一批国家在一个事务内写入，每张表一条 INSERT ... ON CONFLICT DO UPDATE
+        整批失败时回滚到保存点后逐个国家重试（各自一个保存点），只有出错的国家记为失败
+        各数据源内容均未变化的国家不写库；返回 (写入的国家数, 跳过的国家数)，失败（包括抓取/转换阶段的异常）记入result
+        """
+        ready, skipped = [], 0
+        for country, transformed in entries:
+            if isinstance(transformed, BaseException):
+                self._record_failure(result, country, transformed)
                 continue
+            for source in transformed["unchanged"]:
+                result["skipped_sources"][source] += 1
+            if not transformed["changed"]:
+                self.processed_countries.add(country["id"])
+                skipped += 1
+            else:
+                ready.append((country, transformed))
+        result["skipped"] += skipped
+        if not ready:
+            return 0, skipped
 
+        try:
             try:
-                # 1. 批量插入国家基础信息（跳过已处理国家）
-                if self._upsert_country(country):
-                    # 2. 并行/串行获取其他数据源（根据API限制选择）
-                    # 这里使用串行方式避免触发API速率限制
-                    wb_data = self.sources["worldbank"].fetch_data(country_code)
-                    geojson_data = self.sources["naturalearth"].fetch_data(country_code)
-
-                    # 3. 更新关联数据
-                    if wb_data:
-                        self._upsert_demographics(country_code, wb_data)
-                        self._upsert_economy(country_code, wb_data)
-                    
-                    if geojson_data and isinstance(geojson_data, dict):
-                        self._upsert_geojson(country_code, geojson_data)
-
-                    self.processed_countries.add(country_code)
-                    batch_result["updated"] += 1
-
+                with db.session.begin_nested():
+                    changed = self._bulk_write(ready)
+                written = ready
             except Exception as e:
-                logger.warning(f"Failed to process {country_code}: {str(e)}")
-                batch_result["failed"] += 1
-                batch_result["failed_countries"].append({
-                    "code": country_code,
-                    "name": country.get("name", "Unknown"),
-                    "error": str(e)
-                })
-
-        return batch_result
-    
+                logger.warning(f"Bulk write of {len(ready)} countries failed, retrying one by one: {str(e)}")
+                written, changed = [], False
+                for entry in ready:
+                    try:
+                        with db.session.begin_nested():
+                            changed = self._bulk_write([entry]) or changed
+                        written.append(entry)
+                    except Exception as e:
+                        self._record_failure(result, entry[0], e)
+            db.session.commit()
+        except SQLAlchemyError as e:
+            db.session.rollback()
+            for country, _ in ready:
+                self._record_failure(result, country, e)
+            return 0, skipped
+
+        if changed:
+            country_sampler.invalidate()  # 人口、出生率与读模型版本影响抽样
+        for country, _ in written:
+            self.processed_countries.add(country["id"])
+        result["updated"] += len(written)
+        return len(written), skipped
+
+    def _bulk_write(self, entries: List[Tuple[Dict[str, Any], Dict[str, Any]]]) -> bool:
+        """在当前事务中写入一组国家有变化的数据源及内容哈希并刷新读模型，返回是否有数据变化"""
+        now = datetime.utcnow()
+        countries, demographics, economies, geojsons, hashes = [], [], [], [], []
+        for country, transformed in entries:
+            country_code = country["id"]
+            changed_sources = transformed["changed"]
+            if "base" in changed_sources:
+                countries.append({**self._country_values(country), "id": country_code, "created_at": now, "updated_at": now})
+            wb_data = transformed["wb_data"]
+            if wb_data and "worldbank" in changed_sources:
+                demographics.append({"country_id": country_code, **self._demographic_values(wb_data)})
+                economies.append({"country_id": country_code, **self._economy_values(wb_data)})
+            geojson_data = transformed["geojson_data"]
+            if geojson_data and isinstance(geojson_data, dict) and transformed["variants"]:
+                geojsons.append({"country_id": country_code, **self._geojson_values(geojson_data, transformed["variants"])})
+            hashes.append({"country_id": country_code,
+                           **{source: transformed["hashes"].get(source) for source in self.HASHED_SOURCES}})
+
+        # 1. 国家基础信息（内容变化时才更新updated_at）
+        changed = self._bulk_upsert(Country, countries, "id", touch=("updated_at",))
+        # 2. 关联数据，有变化的国家统一刷新updated_at（作为响应缓存的数据版本）
+        touched = (self._bulk_upsert(Demographic, demographics, "country_id")
+                   | self._bulk_upsert(Economy, economies, "country_id")
+                   | self._bulk_upsert(CountryGeoJSON, geojsons, "country_id"))
+        if touched:
+            db.session.execute(update(Country).where(Country.id.in_(touched)).values(updated_at=now))
+
+        # 3. 读模型（API读取路径只查这一行）
+        codes = [country["id"] for country, _ in entries]
+        rows = [
+            {**self._read_model_values(country), "country_id": country.id, "updated_at": now}
+            for country in db.session.query(Country).options(*CountryPayloadBuilder.EAGER_LOADS)
+            .filter(Country.id.in_(codes)).execution_options(populate_existing=True)
+        ]
+        refreshed = self._bulk_upsert(CountryReadModel, rows, "country_id", touch=("validated_at", "updated_at"))
+        # 4. 内容哈希与数据在同一保存点内写入，写入失败时不会留下与数据不符的哈希
+        self._bulk_upsert(CountryDataHash, hashes, "country_id")
+        return bool(changed or touched or refreshed)
+
+    @staticmethod
+    def _bulk_upsert(model, rows: List[Dict[str, Any]], key: str, touch: Tuple[str, ...] = ()) -> set:
+        """
+        多行 INSERT ... ON CONFLICT (key) DO UPDATE：只有内容确有变化的行才会更新（touch中的列随之更新），
+        返回新插入或实际更新的行的key集合
+        """
+        if not rows:
+            return set()
+        table = model.__table__
+        columns = [column for column in rows[0] if column != key and column not in touch and column != "created_at"]
+        stmt = pg_insert(table).values(rows)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[key],
+            set_={column: stmt.excluded[column] for column in columns + list(touch)},
+            where=or_(*(table.c[column].is_distinct_from(stmt.excluded[column]) for column in columns))
+        ).returning(table.c[key])
+        return set(db.session.execute(stmt).scalars())
+
+    def _record_failure(self, result: Dict[str, Any], country: Dict[str, Any], error: BaseException):
+        """记录单个国家的更新失败"""
+        logger.warning(f"Failed to process {country.get('id')}: {str(error)}")
+        result["failed"] += 1
+        result["failed_countries"].append({
+            "code": country.get("id"),
+            "name": country.get("name", "Unknown"),
+            "error": str(error)
+        })
+
+    def _worldbank_data(self, country_code: str) -> Dict[str, Any]:
+        """世界银行数据：已批量预取时直接取用（无数据的国家返回空结构，与逐国请求一致），否则逐国请求"""
+        if self.worldbank_bulk:
+            return self.worldbank_bulk.get(country_code) or {
+                "country_id": country_code, **{category: {} for category in WorldBankSource.INDICATORS}
+            }
+        return self.sources["worldbank"].fetch_data(country_code)
+
     def update_country(self, country_code: str) -> Dict[str, Any]:
         """更新单个国家数据（精简版，直接处理数据库操作）"""
         result = {"country": country_code, "status": "processing", "updated": []}
         country_code = normalize_country_code(country_code)
         
         try:
+            # 0. 逐项写入不维护内容哈希，先删除该国的哈希，下次批量更新时各数据源都会重新写入
+            self._forget_data_hashes(country_code)
+
             # 1. 更新国家基本信息
             base_data = self.sources["restcountries"].fetch_data(country_code)
             if base_data and self._upsert_country(base_data):
@@ -138,10 +333,20 @@ class DataUpdater:
                     result["updated"].append("economy")
             
             # 3. 更新GeoJSON边界数据
-            geojson_data = self.sources["naturalearth"].fetch_data(country_code, if_update_all = self.if_update_all)
+            geojson_data = self.sources["naturalearth"].fetch_data(country_code)
             if geojson_data and isinstance(geojson_data, dict):
                 if self._upsert_geojson(country_code, geojson_data):
                     result["updated"].append("geojson")
+
+            # 4. 只重新计算本国的邻接关系，刷新邻国变化的国家与本国的读模型
+            #    世界TopoJSON不在此重建：读模型比它新即视为过期，首次读取时重建一次
+            changed = self.refresh_country_neighbors(country_code)
+            if changed:
+                result["updated"].append("neighbors")
+            for neighbor_code in changed - {country_code}:
+                self._refresh_read_model(neighbor_code)
+            if self._refresh_read_model(country_code):
+                result["updated"].append("read_model")
             
             result["status"] = "success"
             
@@ -170,33 +375,23 @@ class DataUpdater:
             print(f'查找是否已有国家{country_id}数据')
             country = db.session.query(Country).get(country_id)
 
+            values = self._country_values(country_data)
             if country:
                 # 更新现有记录
                 print(f'更新现有的{country_id}数据')
-                country.name = country_data.get("name", "")
-                country.population = country_data.get("population", 0)
-                country.capital = country_data.get("capital", "")
-                country.longitude = parse_decimal(country_data.get("longitude", 0))
-                country.latitude = parse_decimal(country_data.get("latitude", 0))
-                country.data_completeness = self._calculate_completeness(country_data)
+                for column, value in values.items():
+                    setattr(country, column, value)
             else:
                 # 插入新记录
                 print(f'插入{country_id}数据')
-                country = Country(
-                    id=country_id,
-                    name=country_data.get("name", ""),
-                    population=country_data.get("population", 0),
-                    capital=country_data.get("capital", ""),
-                    longitude=parse_decimal(country_data.get("longitude", 0)),
-                    latitude=parse_decimal(country_data.get("latitude", 0)),
-                    data_completeness=self._calculate_completeness(country_data)
-                )
+                country = Country(id=country_id, **values)
                 db.session.add(country)
 
             print('更新/插入完毕')
             db.session.commit()
 
             print('国家数据更改已提交')
+            country_sampler.invalidate()  # 人口变化影响抽样权重
             return True
 
         except SQLAlchemyError as e:
@@ -204,7 +399,7 @@ class DataUpdater:
             logger.error(f"Country upsert failed: {str(e)}")
             return False
 
-    def _upsert_geojson(self, country_id: str, geojson_data: Dict[str, Any]) -> bool:
+    def _upsert_geojson(self, country_id: str, geojson_data: Dict[str, Any], variants: Optional[Dict[str, bytes]] = None) -> bool:
         #print("geojson_data: ", geojson_data)
         #return True # 临时跳过数据库操作，避免重复插入
 
@@ -215,22 +410,26 @@ class DataUpdater:
             return False
 
         try:
+            # 入库时一次性编码为WKB（控制坐标精度）并生成各精细度的简化版本（流水线中已在transform阶段完成）
+            if variants is None:
+                try:
+                    variants = encode_wkb_variants(geojson_data["geometry"], Config.GEOMETRY_PRECISION)
+                except Exception as e:
+                    logger.warning(f"Invalid geometry for {country_id}: {str(e)}")
+                    return False
+
             geojson = db.session.query(CountryGeoJSON).where(CountryGeoJSON.country_id == country_id).first()
 
+            values = self._geojson_values(geojson_data, variants)
             if geojson:
-                geojson.feature_type = 'FeatureCollection'
-                geojson.geometry_type = geojson_data.get("geometry", {}).get("type")
-                geojson.coordinates = {"type": "FeatureCollection", "features": [geojson_data]}
+                for column, value in values.items():
+                    setattr(geojson, column, value)
             else:
-                geojson = CountryGeoJSON(
-                    country_id=country_id,
-                    feature_type='FeatureCollection',
-                    geometry_type=geojson_data.get("geometry", {}).get("type"),
-                    coordinates={"type": "FeatureCollection", "features": [geojson_data]}
-                )
+                geojson = CountryGeoJSON(country_id=country_id, **values)
                 db.session.add(geojson)
             print("geojson:", geojson)
 
+            self._touch_country_if_changed(country_id, geojson)
             db.session.commit()
             return True
 
@@ -248,22 +447,17 @@ class DataUpdater:
         try:
             demo = db.session.query(Demographic).get(country_id)
 
+            values = self._demographic_values(demo_data)
             if demo:
-                demo.urban_ratio = parse_decimal(demo_data.get("demographics", {}).get("urban_population") / 100) if demo_data.get("demographics", {}).get("urban_population") is not None else None
-                demo.gender_ratio = parse_decimal(demo_data.get('demographics', {}).get("gender_ratio"))
-                demo.median_age = parse_decimal(demo_data.get('demographics', {}).get("median_age"))
-                demo.birth_rate = parse_decimal(demo_data.get('demographics', {}).get("birth_rate"))
+                for column, value in values.items():
+                    setattr(demo, column, value)
             else:
-                demo = Demographic(
-                    country_id=country_id,
-                    urban_ratio=parse_decimal(demo_data.get("demographics", {}).get("urban_population") / 100) if demo_data.get("demographics", {}).get("urban_population") is not None else None,
-                    gender_ratio=parse_decimal(demo_data.get('demographics', {}).get("gender_ratio")),
-                    median_age=parse_decimal(demo_data.get('demographics', {}).get("median_age")),
-                    birth_rate=parse_decimal(demo_data.get('demographics', {}).get("birth_rate"))
-                )
+                demo = Demographic(country_id=country_id, **values)
                 db.session.add(demo)
 
+            self._touch_country_if_changed(country_id, demo)
             db.session.commit()
+            country_sampler.invalidate()  # 出生率变化影响抽样权重
             return True
 
         except SQLAlchemyError as e:
@@ -280,17 +474,15 @@ class DataUpdater:
         try:
             economy = db.session.query(Economy).get(country_id)
 
+            values = self._economy_values(economy_data)
             if economy:
-                economy.gdp_per_capita = parse_decimal(economy_data.get("economy", {}).get("gdp"))
-                economy.internet_penetration = parse_decimal(economy_data.get("economy", {}).get("internet_penetration"))
+                for column, value in values.items():
+                    setattr(economy, column, value)
             else:
-                economy = Economy(
-                    country_id=country_id,
-                    gdp_per_capita=parse_decimal(economy_data.get("economy", {}).get("gdp")),
-                    internet_penetration=parse_decimal(economy_data.get("economy", {}).get("internet_penetration"))
-                )
+                economy = Economy(country_id=country_id, **values)
                 db.session.add(economy)
 
+            self._touch_country_if_changed(country_id, economy)
             db.session.commit()
             return True
 
@@ -299,15 +491,265 @@ class DataUpdater:
             logger.error(f"Economy upsert failed: {str(e)}")
             return False
     
+    def _forget_data_hashes(self, country_id: str) -> bool:
+        """删除国家的数据源内容哈希"""
+        try:
+            db.session.execute(delete(CountryDataHash).where(CountryDataHash.country_id == country_id))
+            db.session.commit()
+            return True
+
+        except SQLAlchemyError as e:
+            db.session.rollback()
+            logger.error(f"Data hash delete failed: {str(e)}")
+            return False
+
+    def _refresh_read_model(self, country_id: str) -> bool:
+        """根据当前各表数据重建该国家的物化读模型行"""
+        try:
+            country = db.session.query(Country).options(
+                *CountryPayloadBuilder.EAGER_LOADS
+            ).filter(Country.id == country_id).first()
+            if not country:
+                return False
+
+            values = self._read_model_values(country)
+            row = db.session.query(CountryReadModel).get(country_id)
+            if row:
+                for column, value in values.items():
+                    setattr(row, column, value)
+            else:
+                row = CountryReadModel(country_id=country_id, **values)
+                db.session.add(row)
+
+            db.session.commit()
+            country_sampler.invalidate()  # 读模型版本变化
+            return True
+
+        except SQLAlchemyError as e:
+            db.session.rollback()
+            logger.error(f"Read model refresh failed: {str(e)}")
+            return False
+
+    # ------------------------------
+    # 各表的行数据（单个国家的upsert与批量写入共用）
+    # ------------------------------
+    def _country_values(self, country_data: Dict[str, Any]) -> Dict[str, Any]:
+        """国家基本信息"""
+        return {
+            "name": country_data.get("name", ""),
+            "population": country_data.get("population", 0),
+            "capital": country_data.get("capital", ""),
+            "longitude": parse_decimal(country_data.get("longitude", 0)),
+            "latitude": parse_decimal(country_data.get("latitude", 0)),
+            "data_completeness": self._calculate_completeness(country_data)
+        }
+
+    @staticmethod
+    def _demographic_values(demo_data: Dict[str, Any]) -> Dict[str, Any]:
+        """人口统计数据"""
+        demographics = demo_data.get("demographics", {})
+        return {
+            "urban_ratio": parse_decimal(demographics.get("urban_population") / 100) if demographics.get("urban_population") is not None else None,
+            "gender_ratio": parse_decimal(demographics.get("gender_ratio")),
+            "median_age": parse_decimal(demographics.get("median_age")),
+            "birth_rate": parse_decimal(demographics.get("birth_rate"))
+        }
+
+    @staticmethod
+    def _economy_values(economy_data: Dict[str, Any]) -> Dict[str, Any]:
+        """经济数据"""
+        economy = economy_data.get("economy", {})
+        return {
+            "gdp_per_capita": parse_decimal(economy.get("gdp")),
+            "internet_penetration": parse_decimal(economy.get("internet_penetration"))
+        }
+
+    @staticmethod
+    def _geojson_values(geojson_data: Dict[str, Any], variants: Dict[str, bytes]) -> Dict[str, Any]:
+        """边界数据（几何为已编码的各精细度WKB）"""
+        return {
+            "feature_type": 'FeatureCollection',
+            "geometry_type": geojson_data.get("geometry", {}).get("type"),
+            "geometry_wkb": variants["full"],
+            "geometry_wkb_medium": variants["medium"],
+            "geometry_wkb_low": variants["low"],
+            "properties": geojson_data.get("properties") or {}
+        }
+
+    @staticmethod
+    def _read_model_values(country: Country) -> Dict[str, Any]:
+        """由国家当前各表数据构建读模型行（country需预加载CountryPayloadBuilder.EAGER_LOADS）"""
+        data = CountryPayloadBuilder.build(country)
+
+        # 写入时校验，读取路径对已校验的行不再重复校验
+        valid, result = RequestValidator.validate(country_schema, data)
+        if valid:
+            data = result
+            schema_version, validated_at = COUNTRY_SCHEMA_VERSION, datetime.utcnow()
+        else:
+            logger.warning(f"Country {country.id} failed schema validation: {result}")
+            schema_version, validated_at = None, None
+
+        geo_json = data.pop("geoJson", None)
+        story_seed = data.pop("storySeed", None)
+        # 几何沿用CountryGeoJSON中的WKB；简化版本的顶点是原始几何顶点的子集，无需再次校验
+        geojson = country.geojson
+        geo_wkb = {detail: getattr(geojson, column) if geojson else None
+                   for detail, column in CountryPayloadBuilder.GEOJSON_COLUMNS.items()}
+        # 量化TopoJSON在写入时一次性生成
+        topo_json = {
+            detail: encode_feature_collection(
+                country.id,
+                geo_json if detail == "full" else CountryPayloadBuilder.format_geojson(geojson, detail),
+                Config.TOPOJSON_QUANTIZATION
+            )
+            for detail in GEOMETRY_DETAILS
+        }
+
+        return {
+            "payload": data,
+            "geo_wkb": geo_wkb["full"],
+            "geo_wkb_medium": geo_wkb["medium"],
+            "geo_wkb_low": geo_wkb["low"],
+            "geo_properties": geojson.properties if geojson else None,
+            "topo_json": topo_json,
+            "story_seed": story_seed,
+            "schema_version": schema_version,
+            "validated_at": validated_at
+        }
+
+    def refresh_country_neighbors(self, country_id: Optional[str] = None) -> set:
+        """
+        由各国边界计算陆地邻接关系（STRtree候选 + 距离容差判定，避免两两比较）
+        指定 country_id 时先取该国几何，缺失或无效则不做任何修改；
+        索引仍由全部边界建立，但只查询该国的候选，只更新与该国有关的邻接关系
+        返回邻国集合发生变化的国家代码
+        """
+        try:
+            query = db.session.query(CountryGeoJSON.country_id, CountryGeoJSON.geometry_wkb)
+            if country_id is not None:
+                row = query.filter(CountryGeoJSON.country_id == country_id).first()
+                target = self._border_shape(country_id, row.geometry_wkb) if row else None
+                if target is None:
+                    logger.warning(f"No valid geometry for {country_id}, neighbors left unchanged")
+                    return set()
+
+            ids, geometries = [], []
+            for code, wkb in query:
+                geometry = self._border_shape(code, wkb)
+                if geometry is not None:
+                    ids.append(code)
+                    geometries.append(geometry)
+
+            tree = STRtree(geometries)
+            sources = [(country_id, target)] if country_id is not None else zip(ids, geometries)
+            pairs = set()
+            for code, geometry in sources:
+                for j in tree.query(geometry, predicate="dwithin", distance=Config.NEIGHBOR_TOLERANCE):
+                    if ids[j] != code:
+                        pairs.add((code, ids[j]))
+                        pairs.add((ids[j], code))
+
+            query = db.session.query(CountryNeighbor.country_id, CountryNeighbor.neighbor_id)
+            if country_id is not None:
+                query = query.filter((CountryNeighbor.country_id == country_id) | (CountryNeighbor.neighbor_id == country_id))
+            existing = set(query)
+            added, removed = pairs - existing, existing - pairs
+            for code, neighbor_id in removed:
+                db.session.execute(delete(CountryNeighbor).where(
+                    CountryNeighbor.country_id == code,
+                    CountryNeighbor.neighbor_id == neighbor_id
+                ))
+            if added:
+                db.session.execute(insert(CountryNeighbor), [
+                    {"country_id": code, "neighbor_id": neighbor_id} for code, neighbor_id in added
+                ])
+            db.session.commit()
+
+            changed = {code for code, _ in added | removed}
+            logger.info(f"Country neighbors refreshed: {len(pairs) // 2} borders, {len(changed)} countries changed")
+            return changed
+
+        except SQLAlchemyError as e:
+            db.session.rollback()
+            logger.error(f"Country neighbors refresh failed: {str(e)}")
+            return set()
+
+    @staticmethod
+    def _border_shape(country_id: str, wkb) -> Optional[Any]:
+        """解码用于邻接计算的国家边界，缺失、无法解析或为空时返回None"""
+        if not wkb:
+            return None
+        try:
+            geometry = shapely.from_wkb(bytes(wkb))
+            if not geometry.is_valid:
+                geometry = to_polygonal(shapely.make_valid(geometry))
+        except Exception as e:
+            logger.warning(f"Skipping invalid geometry for {country_id}: {str(e)}")
+            return None
+        return None if geometry.is_empty else geometry
+
+    @staticmethod
+    def world_topology_stale() -> bool:
+        """世界TopoJSON是否过期（有精细度尚未生成，或有读模型行比它新）"""
+        latest = db.session.query(func.max(CountryReadModel.updated_at)).scalar()
+        if latest is None:
+            return False
+        generated = dict(db.session.query(WorldTopology.detail, WorldTopology.updated_at))
+        return any(generated.get(detail) is None or generated[detail] < latest for detail in GEOMETRY_DETAILS)
+
+    @staticmethod
+    def refresh_world_topology() -> bool:
+        """由读模型中的各国几何生成各精细度的世界TopoJSON（相邻国家共享边界弧线）"""
+        try:
+            rows = db.session.query(CountryReadModel).filter(CountryReadModel.geo_wkb.isnot(None)).all()
+            for detail in GEOMETRY_DETAILS:
+                features = []
+                for row in rows:
+                    wkb = getattr(row, CountryPayloadBuilder.READ_MODEL_GEO_COLUMNS[detail]) or row.geo_wkb
+                    for feature in CountryPayloadBuilder.geojson_from_wkb(wkb, None)["features"]:
+                        # 世界拓扑只保留名称属性，完整数据通过国家接口获取
+                        features.append((row.country_id, {**feature, "properties": {"name": row.payload.get("name")}}))
+
+                topology = encode_topology(features, Config.TOPOJSON_QUANTIZATION)
+                record = db.session.query(WorldTopology).get(detail)
+                if record:
+                    record.topology = topology
+                    record.country_count = len(rows)
+                    record.updated_at = datetime.utcnow()  # 内容未变也刷新生成时间，用于判断是否过期
+                else:
+                    db.session.add(WorldTopology(detail=detail, topology=topology, country_count=len(rows)))
+
+            db.session.commit()
+            logger.info(f"World topology refreshed for {len(rows)} countries")
+            return True
+
+        except SQLAlchemyError as e:
+            db.session.rollback()
+            logger.error(f"World topology refresh failed: {str(e)}")
+            return False
+
     def delete_country(self, country_id: str) -> bool:
         """删除国家所有数据（级联删除）"""
         try:
+            neighbor_ids = [n for (n,) in db.session.query(CountryNeighbor.neighbor_id).filter(CountryNeighbor.country_id == country_id)]
+
             # 按顺序删除关联表数据
             db.session.execute(delete(Demographic).where(Demographic.country_id == country_id))
             db.session.execute(delete(Economy).where(Economy.country_id == country_id))
             db.session.execute(delete(CountryGeoJSON).where(CountryGeoJSON.country_id == country_id))
+            db.session.execute(delete(CountryReadModel).where(CountryReadModel.country_id == country_id))
+            db.session.execute(delete(CountryDataHash).where(CountryDataHash.country_id == country_id))
+            db.session.execute(delete(CountryNeighbor).where(
+                (CountryNeighbor.country_id == country_id) | (CountryNeighbor.neighbor_id == country_id)
+            ))
             result = db.session.execute(delete(Country).where(Country.id == country_id))
             db.session.commit()
+            country_sampler.invalidate()
+
+            # 原邻国的storySeed中包含该国，需要重建读模型
+            for neighbor_id in neighbor_ids:
+                self._refresh_read_model(neighbor_id)
             return result.rowcount > 0
         except SQLAlchemyError as e:
             db.session.rollback()
@@ -323,6 +765,14 @@ class DataUpdater:
         present = sum(1 for field in required if data.get(field) not in (None, ""))
         return round(present / len(required), 2) if required else 0.0
     
+    def _touch_country_if_changed(self, country_id: str, record: Any):
+        """关联表有变化时刷新国家的updated_at（作为响应缓存的数据版本）"""
+        if record in db.session.new or db.session.is_modified(record):
+            db.session.execute(
+                update(Country).where(Country.id == country_id).values(updated_at=datetime.utcnow())
+            )
+            country_sampler.invalidate()
+
     def close(self):
         """关闭所有资源"""
         for source in self.sources.values():
@@ -0,0 +1,151 @@
+import json
+import os
+import shutil
+import tempfile
+import threading
+from pathlib import Path
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+import numpy as np
+from app.utils.data_utils import file_checksum
+from app.utils.logging import get_logger
+
+logger = get_logger(__name__)
+
+STORE_FORMAT = 1
+
+# 单条几何记录：(国家代码列表, Feature属性, 几何类型, 各部分起始下标, N×2坐标数组)
+StoreRecord = Tuple[List[str], Dict[str, Any], int, Optional[np.ndarray], Optional[np.ndarray]]
+
+
+class GeometryStore:
+    """
+    持久化的国家几何存储（只读，内存映射）
+    - 目录内 points.npy(全部坐标)、parts.npy(各记录的环起始下标) 以 mmap 方式打开，
+      index.json 保存每条记录的属性与在两个数组中的偏移，以及国家代码 → 记录下标
+    - 按数据源文件校验和命名目录，数据源不变时可跨运行、跨进程复用
+    """
+
+    def __init__(self, path: Path):
+        self.path = path
+        with open(path / "index.json", encoding="utf-8") as f:
+            index = json.load(f)
+        if index.get("format") != STORE_FORMAT:
+            raise ValueError(f"Unsupported geometry store format: {index.get('format')}")
+        self._records: List[Dict[str, Any]] = index["records"]
+        self._codes: Dict[str, int] = index["codes"]
+        self._points = np.load(path / "points.npy", mmap_mode="r")
+        self._parts = np.load(path / "parts.npy", mmap_mode="r")
+
+    def __len__(self) -> int:
+        return len(self._records)
+
+    def get(self, code: str) -> Optional[Tuple[Dict[str, Any], int, Optional[np.ndarray], Optional[np.ndarray]]]:
+        """按国家代码读取 (属性, 几何类型, parts, points)，不存在时返回None"""
+        i = self._codes.get(code)
+        return None if i is None else self._record(i)
+
+    def __iter__(self) -> Iterator[Tuple[Dict[str, Any], int, Optional[np.ndarray], Optional[np.ndarray]]]:
+        for i in range(len(self._records)):
+            yield self._record(i)
+
+    def _record(self, i: int):
+        record = self._records[i]
+        (p0, p1), (r0, r1) = record["points"], record["parts"]
+        if p0 == p1:
+            return record["properties"], record["shape_type"], None, None
+        return record["properties"], record["shape_type"], self._parts[r0:r1], self._points[p0:p1]
+
+    @classmethod
+    def build(cls, path: Path, records: Iterable[StoreRecord]) -> "GeometryStore":
+        """
+        写入新的存储目录：先写到同级临时目录再整体重命名，
+        并发构建时以先完成者为准，读取方不会看到写了一半的存储
+        """
+        meta: List[Dict[str, Any]] = []
+        codes: Dict[str, int] = {}
+        points_chunks, parts_chunks = [], []
+        n_points = n_parts = 0
+
+        for record_codes, properties, shape_type, parts, points in records:
+            for code in record_codes:
+                if code and code not in codes:
+                    codes[code] = len(meta)
+            if points is None:
+                meta.append({"properties": properties, "shape_type": shape_type,
+                             "points": [n_points, n_points], "parts": [n_parts, n_parts]})
+                continue
+            points_chunks.append(np.asarray(points, dtype="<f8").reshape(-1, 2))
+            parts_chunks.append(np.asarray(parts, dtype="<i8"))
+            meta.append({"properties": properties, "shape_type": shape_type,
+                         "points": [n_points, n_points + len(points)], "parts": [n_parts, n_parts + len(parts)]})
+            n_points += len(points)
+            n_parts += len(parts)
+
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_dir = Path(tempfile.mkdtemp(prefix=f".{path.name}.", dir=path.parent))
+        try:
+            np.save(tmp_dir / "points.npy", np.concatenate(points_chunks) if points_chunks else np.empty((0, 2), dtype="<f8"))
+            np.save(tmp_dir / "parts.npy", np.concatenate(parts_chunks) if parts_chunks else np.empty(0, dtype="<i8"))
+            with open(tmp_dir / "index.json", "w", encoding="utf-8") as f:
+                json.dump({"format": STORE_FORMAT, "records": meta, "codes": codes}, f, ensure_ascii=False)
+            os.chmod(tmp_dir, 0o755)  # mkdtemp创建的目录仅属主可读，其他进程(用户)也需要读取
+            try:
+                os.rename(tmp_dir, path)
+            except OSError:
+                if not (path / "index.json").exists():
+                    raise
+                logger.info(f"Geometry store {path.name} was built concurrently, using existing one")
+        finally:
+            shutil.rmtree(tmp_dir, ignore_errors=True)
+
+        logger.info(f"Built geometry store {path.name} ({len(meta)} records, {n_points} points)")
+        return cls(path)
+
+
+class GeometryStoreCache:
+    """进程内已打开存储的缓存：同一数据源文件只计算一次校验和、只打开一次"""
+
+    def __init__(self):
+        self._stores: Dict[Tuple[str, int, int], GeometryStore] = {}
+        self._lock = threading.Lock()
+
+    def get_or_build(self, store_dir: Path, prefix: str, source_paths: List[str], build_records) -> GeometryStore:
+        """
+        返回与数据源文件内容对应的存储：
+        进程内按 (路径, 修改时间, 大小) 复用，磁盘上按校验和复用，都不存在时调用 build_records() 构建
+        """
+        stat = os.stat(source_paths[0])
+        key = (str(Path(source_paths[0]).resolve()), stat.st_mtime_ns, stat.st_size)
+        store = self._stores.get(key)
+        if store is not None:
+            return store
+
+        with self._lock:
+            store = self._stores.get(key)
+            if store is not None:
+                return store
+
+            checksum = file_checksum(*source_paths)
+            path = store_dir / f"{prefix}_{checksum[:16]}"
+            if (path / "index.json").exists():
+                try:
+                    store = GeometryStore(path)
+                except Exception as e:
+                    logger.warning(f"Discarding unreadable geometry store {path.name}: {str(e)}")
+                    shutil.rmtree(path, ignore_errors=True)
+            if store is None:
+                store = GeometryStore.build(path, build_records())
+                self._remove_stale(store_dir, prefix, keep=path)
+            self._stores[key] = store
+            return store
+
+    @staticmethod
+    def _remove_stale(store_dir: Path, prefix: str, keep: Path):
+        """删除同一数据源旧版本的存储"""
+        for old in store_dir.glob(f"{prefix}_*"):
+            if old != keep and old.is_dir():
+                shutil.rmtree(old, ignore_errors=True)
+
+
+# 进程内共享的存储缓存
+geometry_stores = GeometryStoreCache()
@@ -1,4 +1,5 @@
 from .base_source import BaseDataSource
+from ..config import Config
 from typing import Dict, List, Any
 import logging
 from functools import reduce 
@@ -7,6 +8,7 @@ logger = logging.getLogger(__name__)
 
 class RestCountriesSource(BaseDataSource):
     BASE_URL = "https://restcountries.com/v3.1"
+    CACHE_TTL = Config.RESTCOUNTRIES_CACHE_TTL
     field_groups = [
             # 第1组：核心基础字段（Country表主字段）
             "cca2,name,population,capital,latlng,region,subregion,flags",
@@ -0,0 +1,56 @@
+import random
+from typing import Generic, List, Optional, Sequence, TypeVar
+
+T = TypeVar("T")
+
+
+class AliasTable(Generic[T]):
+    """
+    Walker/Vose 别名表（加权随机抽样）
+    - 构建: O(n)，只需在权重变化时执行一次
+    - 抽样: O(1)，一次均匀随机数 + 一次比较
+    """
+
+    def __init__(self, items: Sequence[T], weights: Sequence[float], rng: Optional[random.Random] = None):
+        if len(items) != len(weights):
+            raise ValueError("items 与 weights 长度不一致")
+        if not items:
+            raise ValueError("items 不能为空")
+
+        total = float(sum(weights))
+        if total <= 0:
+            raise ValueError("权重之和必须大于0")
+
+        n = len(items)
+        self.items: List[T] = list(items)
+        self._rng = rng or random.Random()
+        self._prob: List[float] = [0.0] * n
+        self._alias: List[int] = [0] * n
+
+        # 1. 将权重缩放到均值为1，按是否小于1分到两个工作栈
+        scaled = [float(w) * n / total for w in weights]
+        small = [i for i, p in enumerate(scaled) if p < 1.0]
+        large = [i for i, p in enumerate(scaled) if p >= 1.0]
+
+        # 2. 每次用一个"大"格子补齐一个"小"格子
+        while small and large:
+            s = small.pop()
+            l = large.pop()
+            self._prob[s] = scaled[s]
+            self._alias[s] = l
+            scaled[l] = (scaled[l] + scaled[s]) - 1.0
+            (small if scaled[l] < 1.0 else large).append(l)
+
+        # 3. 剩余格子概率为1（浮点误差导致的残留也归到这里）
+        for i in large + small:
+            self._prob[i] = 1.0
+
+    def __len__(self) -> int:
+        return len(self.items)
+
+    def sample(self) -> T:
+        """按权重抽取一个元素"""
+        n = len(self._prob)
+        u = self._rng.random() * n
+        i = min(int(u), n - 1)
+        return self.items[i] if (u - i) < self._prob[i] else self.items[self._alias[i]]
@@ -1,30 +1,38 @@
+import os
+import re
+import time
 import requests
-from requests.adapters import HTTPAdapter
-from urllib3.util.retry import Retry
-from typing import Optional, Dict, Any
+from pathlib import Path
+from typing import Optional, Dict, Any, Union
 import json
 from ..config import Config
+from .data_utils import file_checksum
+from .cassette import cassette
+from .http_cache import http_cache
+from .http_transport import DeadlineExceeded, HostUnavailable, http_transport
 from .logging import get_logger
 
 logger = get_logger(__name__)
 
+DOWNLOAD_CHUNK_SIZE = 1 << 20  # 流式下载每次写盘的块大小(1MB)
+CONTENT_RANGE = re.compile(r"bytes (?:(\d+)-\d+|\*)/(\d+)")
+
 class APIClient:
-    def __init__(self):
-        self.session = requests.Session()
-        retries = Retry(
-            total=Config.MAX_RETRIES,
-            backoff_factor=1,
-            status_forcelist=[500, 502, 503, 504]
-        )
-        self.session.mount('https://', HTTPAdapter(max_retries=retries))
+    def __init__(self, cache_ttl: int = 0):
+        self.cache_ttl = cache_ttl  # JSON响应磁盘缓存的新鲜期(秒)，0为不缓存
+        # 各数据源共享同一传输层（连接池、重试、熔断与运行总时限）
+        self.transport = http_transport
     
     def get(self, url: str, params: Optional[Dict] = None, headers: Optional[Dict] = None, stream: bool = False) -> Any:
+        if cassette.mode and not stream:
+            return self._cassette_get(url, params, headers)
+        if self.cache_ttl and not stream:
+            return self._cached_get(url, params, headers)
         try:
-            response = self.session.get(
+            response = self.transport.get(
                 url,
                 params=params,
                 headers=headers,
-                timeout=Config.REQUEST_TIMEOUT,
                 stream=stream
             )
             response.raise_for_status()
@@ -33,5 +41,151 @@ class APIClient:
             logger.error(f"API request failed: {str(e)}")
             
     
+    def _cassette_get(self, url: str, params: Optional[Dict], headers: Optional[Dict]) -> Any:
+        """录制模式：请求并把成功的响应写入存档；回放模式：只从存档读取"""
+        key = cassette.key(url, params)
+        if cassette.replaying:
+            body = cassette.load(key)
+            if body is None:
+                logger.error(f"API request failed: no recorded response for {url} (replay mode)")
+                return None
+            return json.loads(body)
+
+        try:
+            response = self.transport.get(url, params=params, headers=headers)
+            response.raise_for_status()
+            data = response.json()
+        except requests.exceptions.RequestException as e:
+            logger.error(f"API request failed: {str(e)}")
+            return None
+        cassette.save(key, response.url, response.content)
+        return data
+
+    def _cached_get(self, url: str, params: Optional[Dict], headers: Optional[Dict]) -> Any:
+        """
+        经磁盘缓存的GET：新鲜期内直接返回缓存；过期后发送条件请求，304时沿用缓存并重新计时；
+        请求失败时退回到过期的缓存
+        """
+        key = http_cache.key(url, params)
+        entry = http_cache.get(key)
+        if entry and time.time() - entry["stored_at"] < self.cache_ttl:
+            return entry["data"]
+
+        request_headers = dict(headers or {})
+        if entry and entry.get("etag"):
+            request_headers["If-None-Match"] = entry["etag"]
+        if entry and entry.get("last_modified"):
+            request_headers["If-Modified-Since"] = entry["last_modified"]
+
+        try:
+            response = self.transport.get(url, params=params, headers=request_headers)
+            if response.status_code == 304 and entry:
+                http_cache.put(key, {**entry, "stored_at": time.time()})
+                return entry["data"]
+            response.raise_for_status()
+            data = response.json()
+        except requests.exceptions.RequestException as e:
+            if entry:
+                logger.warning(f"API request failed, using stale cached response: {str(e)}")
+                return entry["data"]
+            logger.error(f"API request failed: {str(e)}")
+            return None
+
+        if "no-store" not in response.headers.get("Cache-Control", ""):
+            http_cache.put(key, {
+                "url": response.url,
+                "etag": response.headers.get("ETag"),
+                "last_modified": response.headers.get("Last-Modified"),
+                "stored_at": time.time(),
+                "data": data
+            })
+        return data
+
+    def download(self, url: str, path: Union[str, Path], sha256: Optional[str] = None) -> bool:
+        """
+        流式下载文件到 path，内存占用与文件大小无关
+        - 数据先写入 path.part，中断后按已写入的字节数发送 Range 请求续传（服务器不支持时从头下载）
+        - 完成后校验大小（服务器声明的总长度）与可选的SHA-256，通过后原子重命名为 path
+        """
+        path = Path(path)
+        if cassette.replaying:
+            if cassette.extract(cassette.key(url), path):
+                return True
+            logger.error(f"Download failed: no recorded file for {url} (replay mode)")
+            return False
+
+        part = path.with_name(path.name + ".part")
+        path.parent.mkdir(parents=True, exist_ok=True)
+
+        for attempt in range(Config.MAX_RETRIES + 1):
+            if attempt:
+                time.sleep(attempt)
+            offset = part.stat().st_size if part.exists() else 0
+            try:
+                total = self._download_to(url, part, offset)
+            except (HostUnavailable, DeadlineExceeded) as e:
+                logger.error(f"Download failed: {str(e)}, partial file kept for resume")
+                return False
+            except requests.exceptions.HTTPError as e:
+                status = e.response.status_code if e.response is not None else None
+                if status is not None and 400 <= status < 500:
+                    logger.error(f"Download failed: {str(e)}")
+                    return False
+                logger.warning(f"Download of {url} failed ({str(e)}), retrying")
+                continue
+            except requests.exceptions.RequestException as e:
+                logger.warning(f"Download of {url} interrupted at {part.stat().st_size if part.exists() else 0} bytes ({str(e)}), resuming")
+                continue
+
+            size = part.stat().st_size
+            if total is None or size == total:
+                break
+            if size > total:
+                logger.warning(f"Partial file {part.name} is larger than the remote file, restarting download")
+                part.unlink()
+            else:
+                logger.warning(f"Download of {url} ended early at {size}/{total} bytes, resuming")
+        else:
+            logger.error(f"Download of {url} failed after {Config.MAX_RETRIES + 1} attempts, partial file kept for resume")
+            return False
+
+        if sha256 and file_checksum(str(part)) != sha256.lower():
+            logger.error(f"Checksum mismatch for {url}, discarding download")
+            part.unlink()
+            return False
+
+        os.replace(part, path)
+        if cassette.mode:
+            cassette.save_file(cassette.key(url), url, path)
+        return True
+
+    def _download_to(self, url: str, part: Path, offset: int) -> Optional[int]:
+        """从 offset 处下载到 part，返回远端文件总长度（未知时为None）"""
+        # 禁用压缩编码，保证Range偏移与写入的字节一致
+        headers = {"Accept-Encoding": "identity"}
+        if offset:
+            headers["Range"] = f"bytes={offset}-"
+
+        # 由下载循环负责重试（从已写入的位置续传）
+        with self.transport.get(url, retry=False, headers=headers, stream=True) as response:
+            match = CONTENT_RANGE.match(response.headers.get("Content-Range", ""))
+            if response.status_code == 416 and offset:
+                # 请求范围超出文件末尾：part已完整（或远端文件已变化，由调用方按长度判断）
+                return int(match.group(2)) if match else None
+            response.raise_for_status()
+
+            if response.status_code == 206 and match and match.group(1) and int(match.group(1)) == offset:
+                mode, total = "ab", int(match.group(2))
+            else:
+                # 服务器忽略了Range：从头写入
+                length = response.headers.get("Content-Length", "")
+                mode, total = "wb", int(length) if length.isdigit() else None
+
+            with open(part, mode) as f:
+                for chunk in response.iter_content(chunk_size=DOWNLOAD_CHUNK_SIZE):
+                    f.write(chunk)
+        return total
+
     def close(self):
-        self.session.close()
\ No newline at end of file
+        # 传输层为共享的，不随单个客户端关闭
+        cassette.close()  # 录制中的存档写入zip目录
\ No newline at end of file
@@ -0,0 +1,102 @@
+import atexit
+import os
+import shutil
+import threading
+import zipfile
+from pathlib import Path
+from typing import Optional, Set, Union
+from ..config import Config
+from .http_cache import HTTPCache
+from .logging import get_logger
+
+logger = get_logger(__name__)
+
+MODES = ("", "record", "replay")
+
+
+class Cassette:
+    """
+    上游HTTP响应的录制/回放存档（单个zip文件，条目名为请求键，条目注释为请求URL）
+    - record：照常访问网络，成功的响应写入存档（JSON压缩存储，下载的文件原样存储）
+    - replay：只从存档读取，不访问网络；存档中没有的请求按请求失败处理
+    可用于离线完整运行 DataUpdater.batch_update_all_countries（性能分析、回归比对）
+    """
+
+    def __init__(self, path: Union[str, Path], mode: str = ""):
+        if mode not in MODES:
+            raise ValueError(f"Unknown cassette mode: {mode}")
+        self.path = Path(path)
+        self.mode = mode
+        self._zip: Optional[zipfile.ZipFile] = None
+        self._names: Set[str] = set()
+        self._lock = threading.Lock()
+
+    @property
+    def replaying(self) -> bool:
+        return self.mode == "replay"
+
+    @staticmethod
+    def key(url: str, params=None) -> str:
+        return HTTPCache.key(url, params)
+
+    def load(self, key: str) -> Optional[bytes]:
+        """回放：读取录制的响应体，未录制时返回None"""
+        with self._lock:
+            z = self._open()
+            return z.read(key) if key in self._names else None
+
+    def extract(self, key: str, path: Path) -> bool:
+        """回放：把录制的文件写到 path（先写临时文件再重命名），未录制时返回False"""
+        part = path.with_name(path.name + ".part")
+        with self._lock:
+            z = self._open()
+            if key not in self._names:
+                return False
+            path.parent.mkdir(parents=True, exist_ok=True)
+            with z.open(key) as src, open(part, "wb") as dst:
+                shutil.copyfileobj(src, dst)
+        os.replace(part, path)
+        return True
+
+    def save(self, key: str, url: str, body: bytes):
+        """录制：写入响应体（同一请求只保留首次录制的结果）"""
+        info = zipfile.ZipInfo(key, date_time=(1980, 1, 1, 0, 0, 0))
+        info.compress_type = zipfile.ZIP_DEFLATED
+        info.comment = url.encode("utf-8")
+        with self._lock:
+            z = self._open()
+            if key not in self._names:
+                z.writestr(info, body)
+                self._names.add(key)
+
+    def save_file(self, key: str, url: str, path: Path):
+        """录制：写入下载的文件（已压缩的文件不再压缩）"""
+        with self._lock:
+            z = self._open()
+            if key not in self._names:
+                z.write(path, arcname=key, compress_type=zipfile.ZIP_STORED)
+                z.getinfo(key).comment = url.encode("utf-8")
+                self._names.add(key)
+
+    def close(self):
+        """关闭存档（录制时写入zip目录）；之后的读写会重新打开"""
+        with self._lock:
+            if self._zip is not None:
+                self._zip.close()
+                self._zip = None
+
+    def _open(self) -> zipfile.ZipFile:
+        if self._zip is None:
+            if self.replaying:
+                self._zip = zipfile.ZipFile(self.path)
+            else:
+                self.path.parent.mkdir(parents=True, exist_ok=True)
+                self._zip = zipfile.ZipFile(self.path, "a")
+                logger.info(f"Recording upstream responses to {self.path}")
+            self._names = set(self._zip.namelist())
+        return self._zip
+
+
+# 进程内共享的录制/回放存档（HTTP_CASSETTE_MODE 未设置时不启用）
+cassette = Cassette(Config.HTTP_CASSETTE, Config.HTTP_CASSETTE_MODE)
+atexit.register(cassette.close)
@@ -0,0 +1,77 @@
+from typing import Any, Dict
+import shapely
+from shapely.geometry import MultiPolygon, mapping, shape
+from .logging import get_logger
+
+logger = get_logger(__name__)
+
+# 几何精细度级别（full为原始数据）
+GEOMETRY_DETAILS = ("low", "medium", "full")
+
+# 各简化级别的容差(度)：low约11km，适合世界地图；medium约2km，适合国家级地图
+DETAIL_TOLERANCES = {
+    "low": 0.1,
+    "medium": 0.02,
+}
+
+
+def encode_wkb_variants(geometry: Dict[str, Any], precision: int) -> Dict[str, bytes]:
+    """
+    GeoJSON geometry → 各精细度的WKB {"full": ..., "medium": ..., "low": ...}
+    - 坐标先对齐到precision位小数的网格（set_precision会修复取整造成的自相交），简化在取整后的几何上进行
+    """
+    rounded = shapely.set_precision(shape(geometry), 10.0 ** -precision)
+    variants = {"full": shapely.to_wkb(rounded)}
+    for detail, tolerance in DETAIL_TOLERANCES.items():
+        variants[detail] = shapely.to_wkb(simplify_shape(rounded, tolerance))
+    return variants
+
+
+def decode_wkb(wkb) -> Dict[str, Any]:
+    """WKB → GeoJSON geometry"""
+    return shape_to_geojson(shapely.from_wkb(bytes(wkb)))
+
+
+def simplify_shape(geometry, tolerance: float):
+    """保持拓扑的几何简化，失败或结果为空时返回原几何"""
+    try:
+        simplified = geometry.simplify(tolerance, preserve_topology=True)
+        return geometry if simplified.is_empty else simplified
+    except Exception as e:
+        logger.warning(f"Geometry simplification failed: {str(e)}")
+        return geometry
+
+
+def shape_to_geojson(geometry) -> Dict[str, Any]:
+    """shapely几何 → GeoJSON geometry（面要素的坐标数组由NumPy批量转换为列表）"""
+    if geometry.geom_type == "Polygon":
+        return {"type": "Polygon", "coordinates": _polygon_coordinates(geometry)}
+    if geometry.geom_type == "MultiPolygon":
+        return {"type": "MultiPolygon", "coordinates": [_polygon_coordinates(p) for p in geometry.geoms]}
+    return _to_lists(mapping(geometry))
+
+
+def to_polygonal(geometry):
+    """只保留面要素（裁剪/修复后可能得到含线、点的GeometryCollection）"""
+    if geometry.geom_type in ("Polygon", "MultiPolygon"):
+        return geometry
+    polygons = []
+    for part in shapely.get_parts(geometry):
+        if part.geom_type == "Polygon":
+            polygons.append(part)
+        elif part.geom_type == "MultiPolygon":
+            polygons.extend(part.geoms)
+    return MultiPolygon(polygons)
+
+
+def _polygon_coordinates(polygon) -> list:
+    rings = [polygon.exterior, *polygon.interiors]
+    return [shapely.get_coordinates(ring).tolist() for ring in rings]
+
+
+def _to_lists(value: Any) -> Any:
+    if isinstance(value, (list, tuple)):
+        return [_to_lists(v) for v in value]
+    if isinstance(value, dict):
+        return {k: _to_lists(v) for k, v in value.items()}
+    return value
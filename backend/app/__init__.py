@@ -18,9 +18,11 @@ def create_app(config_class=Config):
     from app.routes.main import bp as main_bp
     from app.routes.docs import bp as docs_bp
     from app.routes.api import bp as api_bp
+    from app.routes.tiles import bp as tiles_bp
     
     app.register_blueprint(main_bp)
     app.register_blueprint(docs_bp)
     app.register_blueprint(api_bp, url_prefix='/api')
+    app.register_blueprint(tiles_bp)
     
     return app
\ No newline at end of file
@@ -27,6 +27,69 @@ class Config:
 
     REQUEST_TIMEOUT = (3.05, 27) 
 
+    # 批量更新时并发抓取外部数据：线程总数与每个主机同时进行的请求数
+    FETCH_CONCURRENCY = int(os.environ.get('FETCH_CONCURRENCY') or 16)
+    FETCH_CONCURRENCY_PER_HOST = int(os.environ.get('FETCH_CONCURRENCY_PER_HOST') or 4)
+
+    # 更新流水线：阶段间队列容量（写库慢时上游最多积压的国家数）与transform阶段线程数
+    PIPELINE_QUEUE_SIZE = int(os.environ.get('PIPELINE_QUEUE_SIZE') or 32)
+    PIPELINE_TRANSFORM_WORKERS = int(os.environ.get('PIPELINE_TRANSFORM_WORKERS') or 2)
+
+    # Natural Earth压缩包的SHA-256（可选，格式 "10m=<hex>,110m=<hex>"），配置后下载完成时校验
+    NATURALEARTH_SHA256 = dict(
+        item.strip().split('=', 1) for item in (os.environ.get('NATURALEARTH_SHA256') or '').split(',') if '=' in item
+    )
+
+    # 外部HTTP请求（所有数据源共享连接池）：429/503响应的Retry-After最长等待(秒)，超过时不再重试
+    HTTP_RETRY_AFTER_MAX = int(os.environ.get('HTTP_RETRY_AFTER_MAX') or 60)
+    # 每个主机的熔断：连续失败次数阈值、熔断后的冷却时间(秒)，冷却后放行一个试探请求
+    CIRCUIT_BREAKER_FAILURES = int(os.environ.get('CIRCUIT_BREAKER_FAILURES') or 5)
+    CIRCUIT_BREAKER_RESET = int(os.environ.get('CIRCUIT_BREAKER_RESET') or 60)
+    # 一次批量更新中外部请求的总时限(秒)，超时后剩余请求立即失败
+    UPDATE_DEADLINE = int(os.environ.get('UPDATE_DEADLINE') or 3600)
+
+    # 外部API响应的磁盘缓存：目录、总字节上限，以及各数据源的新鲜期(秒，0为不缓存)
+    # 新鲜期内直接使用缓存，过期后以ETag/Last-Modified发送条件请求，未变化(304)时不重新下载
+    HTTP_CACHE_DIR = os.environ.get('HTTP_CACHE_DIR') or 'cache/http_cache'
+    HTTP_CACHE_MAX_BYTES = int(os.environ.get('HTTP_CACHE_MAX_BYTES') or 256 * 1024 * 1024)
+    RESTCOUNTRIES_CACHE_TTL = int(os.environ.get('RESTCOUNTRIES_CACHE_TTL') or 86400)
+    WORLDBANK_CACHE_TTL = int(os.environ.get('WORLDBANK_CACHE_TTL') or 86400)
+
+    # 上游响应的录制/回放存档（离线运行、性能分析与回归比对）：模式为 record 或 replay，未设置时不启用
+    # 启用时不经过上面的磁盘缓存；replay 模式不访问网络
+    HTTP_CASSETTE = os.environ.get('HTTP_CASSETTE') or 'cache/http_cassette.zip'
+    HTTP_CASSETTE_MODE = os.environ.get('HTTP_CASSETTE_MODE') or ''
+
+    # 加权抽样权重表的最长缓存时间(秒)，数据更新时会主动失效
+    COUNTRY_SAMPLER_TTL = int(os.environ.get('COUNTRY_SAMPLER_TTL') or 300)
+
+    # 预序列化/预压缩国家响应缓存的总字节上限
+    PAYLOAD_CACHE_MAX_BYTES = int(os.environ.get('PAYLOAD_CACHE_MAX_BYTES') or 64 * 1024 * 1024)
+
+    # GET /api/country/<code> 的浏览器/CDN缓存时间(秒)，过期后通过ETag重新验证
+    COUNTRY_CACHE_MAX_AGE = int(os.environ.get('COUNTRY_CACHE_MAX_AGE') or 3600)
+
+    # 批量接口(count=N / ids=...)单次请求的国家数量上限
+    COUNTRY_BATCH_LIMIT = int(os.environ.get('COUNTRY_BATCH_LIMIT') or 100)
+
+    # 入库几何坐标保留的小数位数（6位约0.1米）
+    GEOMETRY_PRECISION = int(os.environ.get('GEOMETRY_PRECISION') or 6)
+
+    # TopoJSON坐标量化精度（每个坐标轴的整数格数）
+    TOPOJSON_QUANTIZATION = int(os.environ.get('TOPOJSON_QUANTIZATION') or 100000)
+
+    # 矢量瓦片(MVT)：数据源分辨率、磁盘缓存目录、最大缩放级别、浏览器/CDN缓存时间(秒)
+    TILE_SOURCE_RESOLUTION = os.environ.get('TILE_SOURCE_RESOLUTION') or '110m'
+    TILE_CACHE_DIR = os.environ.get('TILE_CACHE_DIR') or 'cache/tile_cache'
+    TILE_MAX_ZOOM = int(os.environ.get('TILE_MAX_ZOOM') or 10)
+    TILE_CACHE_MAX_AGE = int(os.environ.get('TILE_CACHE_MAX_AGE') or 86400)
+
+    # 点查国家/包围盒查询所用空间索引的数据源分辨率
+    SPATIAL_INDEX_RESOLUTION = os.environ.get('SPATIAL_INDEX_RESOLUTION') or '110m'
+
+    # 判定两国接壤的边界距离容差(度)，吸收不同数据源边界之间的细小缝隙
+    NEIGHBOR_TOLERANCE = float(os.environ.get('NEIGHBOR_TOLERANCE') or 0.02)
+
 class DevelopmentConfig(Config):
     DEBUG = True
 
@@ -24,16 +24,30 @@ class Country(db.Model):
     milestones = db.relationship('Milestone', backref='country', uselist=False, lazy=True)
     events = db.relationship('HistoricalEvent', backref='country', lazy=True)
     country_metadata = db.relationship('Metadata', backref='country', uselist=False, lazy=True)
+    read_model = db.relationship('CountryReadModel', backref='country', uselist=False, lazy=True)
+    neighbors = db.relationship(
+        'Country',
+        secondary='country_neighbors',
+        primaryjoin='Country.id == CountryNeighbor.country_id',
+        secondaryjoin='Country.id == CountryNeighbor.neighbor_id',
+        order_by='Country.id',
+        viewonly=True,
+        lazy=True
+    )
 
 
 class CountryGeoJSON(db.Model):
     __tablename__ = 'country_geojson'
     
     id = db.Column(db.Integer, primary_key=True)
-    country_id = db.Column(db.String(2), db.ForeignKey('countries.id', ondelete='CASCADE'), nullable=False)
+    # 每个国家一行（批量写入以此作为 ON CONFLICT 目标；已有库由 backend/migrations 升级）
+    country_id = db.Column(db.String(2), db.ForeignKey('countries.id', ondelete='CASCADE'), nullable=False, unique=True)
     feature_type = db.Column(db.String(20), nullable=False)
     geometry_type = db.Column(db.String(20), nullable=False)
-    coordinates = db.Column(JSONB, nullable=False)  # PostgreSQL JSONB类型
+    geometry_wkb = db.Column(db.LargeBinary, nullable=False)  # WKB，坐标精度见 Config.GEOMETRY_PRECISION
+    geometry_wkb_medium = db.Column(db.LargeBinary)  # 简化版本（见 app.utils.geometry.DETAIL_TOLERANCES）
+    geometry_wkb_low = db.Column(db.LargeBinary)
+    properties = db.Column(JSONB)  # GeoJSON Feature 的属性
 
 
 class Demographic(db.Model):
@@ -99,4 +113,49 @@ class Metadata(db.Model):
     
     country_id = db.Column(db.String(2), db.ForeignKey('countries.id', ondelete='CASCADE'), primary_key=True)
     source = db.Column(db.String(100), nullable=False)
-    license = db.Column(db.String(50), nullable=False)
\ No newline at end of file
+    license = db.Column(db.String(50), nullable=False)
+
+
+class CountryReadModel(db.Model):
+    """国家API响应的物化读模型（由DataUpdater在更新时写入）"""
+    __tablename__ = 'country_read_model'
+
+    country_id = db.Column(db.String(2), db.ForeignKey('countries.id', ondelete='CASCADE'), primary_key=True)
+    payload = db.Column(JSONB, nullable=False)  # 基础字段: id/name/population/capital/location
+    geo_wkb = db.Column(db.LargeBinary)  # 几何以WKB存储，读取时才解码为GeoJSON
+    geo_wkb_medium = db.Column(db.LargeBinary)
+    geo_wkb_low = db.Column(db.LargeBinary)
+    geo_properties = db.Column(JSONB)
+    topo_json = db.Column(JSONB)  # 各几何精细度的量化TopoJSON: {"low": {...}, "medium": {...}, "full": {...}}
+    story_seed = db.Column(JSONB)
+    schema_version = db.Column(db.Integer)  # 写入时通过校验的country_schema版本，未通过为NULL
+    validated_at = db.Column(db.DateTime)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+
+class CountryDataHash(db.Model):
+    """各数据源内容的哈希（由DataUpdater写入，内容未变化的数据源在更新时跳过写入）"""
+    __tablename__ = 'country_data_hashes'
+
+    country_id = db.Column(db.String(2), db.ForeignKey('countries.id', ondelete='CASCADE'), primary_key=True)
+    base = db.Column(db.String(64))  # REST Countries基础信息（含TopoJSON量化参数与读模型schema版本）
+    worldbank = db.Column(db.String(64))  # 世界银行指标（人口统计与经济）
+    geometry = db.Column(db.String(64))  # Natural Earth边界（含坐标精度与简化容差）
+
+
+class CountryNeighbor(db.Model):
+    """陆地边界邻接关系（双向各存一行，由DataUpdater在更新时计算）"""
+    __tablename__ = 'country_neighbors'
+
+    country_id = db.Column(db.String(2), db.ForeignKey('countries.id', ondelete='CASCADE'), primary_key=True)
+    neighbor_id = db.Column(db.String(2), db.ForeignKey('countries.id', ondelete='CASCADE'), primary_key=True)
+
+
+class WorldTopology(db.Model):
+    """全部国家共享边界的世界TopoJSON（由DataUpdater在更新后生成）"""
+    __tablename__ = 'world_topology'
+
+    detail = db.Column(db.String(10), primary_key=True)  # low / medium / full
+    topology = db.Column(JSONB, nullable=False)
+    country_count = db.Column(db.Integer)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
@@ -31,6 +31,7 @@ def get_life_story_prompt(country_data: dict) -> str:
 **数据使用规则:**
 1.  **数据存在时**: 严格参考数据。例如，如果 `university_rate` 是 `0.42`，那么主角上大学的概率就应该是中等偏下。如果 `main_industries` 包含 "IT服务"，那么主角从事相关职业的可能性就更高。
 2.  **数据缺失时 (`null` 或字段不存在)**: 这是你发挥创造力的时刻！**你必须利用你对世界的广泛认知，为【{country_name}】做出合理且有趣的推断**。例如，如果 `historicalEvents` 为空，你可以自行加入全球青年熟知的事件，如智能手机的普及、社交媒体的兴起、某款现象级游戏（如《原神》）的发布、或是ChatGPT的诞生。
+3.  **邻国 (`neighbors`)**: 这是与【{country_name}】陆地接壤的真实国家列表。涉及出境旅行、移民、跨境工作或留学时，可以优先考虑这些邻国；列表为空表示没有陆地邻国（如岛国）。
 
 ### 故事风格与要求
 - **时代感与趣味性**: 故事必须有强烈的时代感，巧妙地融入全球性的流行文化、网络梗、科技变革和社会事件。不要写成干巴巴的流水账。
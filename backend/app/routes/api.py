@@ -1,22 +1,105 @@
-from flask import Blueprint, request, jsonify
+from flask import Blueprint, request, jsonify, redirect, url_for, current_app
 from app.services.country_service import CountryService
+from app.services.country_spatial_index import country_spatial_index
+from app.services.country_payload import CountryPayloadBuilder, FieldSelection
+from app.utils.geometry import GEOMETRY_DETAILS
 from app.utils.api_response import APIResponse
 from app.services.data_updater import DataUpdater
 
 bp = Blueprint('api', __name__)
 
+
+def _parse_fields():
+    """解析稀疏字段参数fields，返回 (FieldSelection或None, 错误响应或None)"""
+    if 'fields' not in request.args:
+        return None, None
+    try:
+        return FieldSelection.parse(request.args['fields']), None
+    except ValueError as e:
+        return None, APIResponse.json_error("400", "Invalid fields", str(e))
+
+
+def _parse_detail():
+    """解析几何精细度参数detail，返回 (精细度, 错误响应或None)"""
+    detail = request.args.get('detail', 'full')
+    if detail not in GEOMETRY_DETAILS:
+        return None, APIResponse.json_error("400", "Invalid detail", f"detail must be one of {', '.join(GEOMETRY_DETAILS)}")
+    return detail, None
+
+
+# 通过Accept协商TopoJSON时使用的媒体类型
+TOPOJSON_MIMETYPE = 'application/topo+json'
+
+
+def _parse_geo_format():
+    """解析几何输出格式：format参数优先，其次Accept头，返回 (格式, 错误响应或None)"""
+    geo_format = request.args.get('format')
+    if geo_format is None:
+        best = request.accept_mimetypes.best_match(['application/json', TOPOJSON_MIMETYPE])
+        geo_format = 'topojson' if best == TOPOJSON_MIMETYPE else 'geojson'
+    if geo_format not in CountryPayloadBuilder.GEO_FORMATS:
+        return None, APIResponse.json_error("400", "Invalid format", f"format must be one of {', '.join(CountryPayloadBuilder.GEO_FORMATS)}")
+    return geo_format, None
+
+
 @bp.route('/country', methods=['GET', 'POST'])
 def country_endpoint():
     """
     按出生潜力(出生率×总人口)加权随机返回一个国家数据
     - 权重计算: 出生率(‰) × 总人口(人) → 代表该国每年新生儿数量(万为单位)
     - 出生率缺失时使用默认值15.0‰(全球平均水平)
+    - mode=id: 只返回选中的国家代码与资源地址；mode=redirect: 302跳转到可缓存的 /api/country/<code>
+    - count=N: 一次返回N次加权抽样的结果列表
+    - fields=id,name,storySeed.demographics: 只返回（并只查询）指定字段
+    - detail=low|medium|full: geoJson的几何精细度（默认full）
+    - format=topojson (或 Accept: application/topo+json): 几何部分以量化TopoJSON输出为topoJson
     """
     if request.method == 'GET':
-        valid, data = CountryService.get_country()
+        fields, error = _parse_fields()
+        if error:
+            return error
+        detail, error = _parse_detail()
+        if error:
+            return error
+        geo_format, error = _parse_geo_format()
+        if error:
+            return error
+
+        if 'count' in request.args:
+            count = request.args.get('count', type=int)
+            limit = current_app.config['COUNTRY_BATCH_LIMIT']
+            if count is None or not 1 <= count <= limit:
+                return APIResponse.json_error("400", "Invalid count", f"count must be an integer between 1 and {limit}")
+            valid, data = CountryService.get_random_countries(count, fields, detail, geo_format)
+            if not valid:
+                return jsonify(data), int(data['error']['code'])
+            return jsonify(APIResponse.success(data))
+
+        mode = request.args.get('mode', 'full')
+        if mode in ('id', 'redirect'):
+            valid, data = CountryService.pick_random_country_id()
+            if not valid:
+                return jsonify(data), int(data['error']['code'])
+            href = url_for('api.country_resource', code=data, detail=detail if detail != 'full' else None,
+                           format=request.args.get('format'))
+            response = redirect(href) if mode == 'redirect' else jsonify(APIResponse.success({"id": data, "href": href}))
+            response.cache_control.no_store = True
+            return response
+
+        if fields:
+            valid, data = CountryService.get_random_countries(1, fields, detail, geo_format)
+            if not valid:
+                return jsonify(data), int(data['error']['code'])
+            if not data:
+                return APIResponse.json_error("400", "Invalid country data")
+            return jsonify(APIResponse.success(data[0]))
+
+        valid, data = CountryService.get_country_payload(detail, geo_format)
         if not valid:
             return jsonify(data), int(data['error']['code'])
-        return jsonify(data)
+        response = data.to_response()
+        response.vary.add('Accept')
+        return response
 
     '''
     elif request.method == 'POST':
@@ -34,6 +117,139 @@ def country_endpoint():
     '''
     
 
+@bp.route('/country-at', methods=['GET'])
+def country_at_endpoint():
+    """
+    按经纬度反查所在国家（空间索引，点在国家边界上也算）
+    - lon: 经度 [-180, 180]；lat: 纬度 [-90, 90]
+    - 不放在 /country/ 下，避免与国家代码 AT（奥地利）冲突
+    """
+    lon = request.args.get('lon', type=float)
+    lat = request.args.get('lat', type=float)
+    if lon is None or lat is None or not (-180 <= lon <= 180 and -90 <= lat <= 90):
+        return APIResponse.json_error("400", "Invalid coordinates", "lon must be in [-180, 180] and lat in [-90, 90]")
+
+    try:
+        country = country_spatial_index.country_at(lon, lat)
+    except Exception as e:
+        current_app.logger.error(f"Spatial lookup failed: {str(e)}")
+        return APIResponse.json_error("500", "空间索引不可用", status_code=500)
+    if not country:
+        return APIResponse.json_error("404", "该位置不属于任何国家", status_code=404)
+    return jsonify(APIResponse.success({**country, "href": url_for('api.country_resource', code=country['id'])}))
+
+
+@bp.route('/country/<code>', methods=['GET'])
+def country_resource(code):
+    """
+    按国家代码返回国家数据（可缓存资源）
+    - 强ETag由国家代码与数据版本派生，支持If-None-Match → 304
+    - 支持fields稀疏字段参数（稀疏结果不带ETag）
+    - 支持detail几何精细度参数与format输出格式参数
+    """
+    fields, error = _parse_fields()
+    if error:
+        return error
+    detail, error = _parse_detail()
+    if error:
+        return error
+    geo_format, error = _parse_geo_format()
+    if error:
+        return error
+    if fields:
+        countries = CountryService.get_countries_data([code], fields, detail, geo_format)
+        if not countries:
+            return APIResponse.json_error("404", "国家数据不存在", status_code=404)
+        return jsonify(APIResponse.success(next(iter(countries.values()))))
+
+    valid, data = CountryService.get_country_payload_by_code(code, detail, geo_format)
+    if not valid:
+        return jsonify(data), int(data['error']['code'])
+    response = data.to_response(max_age=current_app.config['COUNTRY_CACHE_MAX_AGE'])
+    response.vary.add('Accept')
+    return response
+
+
+@bp.route('/country/<code>/neighbors', methods=['GET'])
+def country_neighbors_endpoint(code):
+    """返回与该国陆地接壤的国家（代码、名称、资源地址）"""
+    valid, data = CountryService.get_country_neighbors(code)
+    if not valid:
+        return jsonify(data), int(data['error']['code'])
+    return jsonify(APIResponse.success([
+        {**neighbor, "href": url_for('api.country_resource', code=neighbor['id'])} for neighbor in data
+    ]))
+
+
+@bp.route('/countries', methods=['GET'])
+def countries_endpoint():
+    """
+    批量按国家代码返回国家数据
+    - ids: 逗号分隔的国家代码，如 ids=CN,US,IN
+    - 返回顺序与请求一致，不存在的国家会被忽略
+    - 支持fields稀疏字段参数、detail几何精细度参数与format输出格式参数
+    """
+    fields, error = _parse_fields()
+    if error:
+        return error
+    detail, error = _parse_detail()
+    if error:
+        return error
+    geo_format, error = _parse_geo_format()
+    if error:
+        return error
+
+    ids = [i.strip().upper() for i in request.args.get('ids', '').split(',') if i.strip()]
+    limit = current_app.config['COUNTRY_BATCH_LIMIT']
+    if not ids or len(ids) > limit:
+        return APIResponse.json_error("400", "Invalid ids", f"ids must contain 1 to {limit} country codes")
+
+    countries = CountryService.get_countries_data(ids, fields, detail, geo_format)
+    if not countries:
+        return APIResponse.json_error("404", "国家数据不存在", status_code=404)
+    return jsonify(APIResponse.success([countries[i] for i in dict.fromkeys(ids) if i in countries]))
+
+
+@bp.route('/countries/in-bbox', methods=['GET'])
+def countries_in_bbox_endpoint():
+    """
+    返回与包围盒相交的国家（代码、名称、包围盒、中心点）
+    - bbox=minLon,minLat,maxLon,maxLat；minLon > maxLon 表示跨越180°经线
+    """
+    try:
+        min_lon, min_lat, max_lon, max_lat = (float(v) for v in request.args.get('bbox', '').split(','))
+    except ValueError:
+        return APIResponse.json_error("400", "Invalid bbox", "bbox must be minLon,minLat,maxLon,maxLat")
+    if not (-180 <= min_lon <= 180 and -180 <= max_lon <= 180 and -90 <= min_lat <= max_lat <= 90):
+        return APIResponse.json_error("400", "Invalid bbox", "bbox must be minLon,minLat,maxLon,maxLat")
+
+    try:
+        countries = country_spatial_index.countries_in_bbox(min_lon, min_lat, max_lon, max_lat)
+    except Exception as e:
+        current_app.logger.error(f"Spatial lookup failed: {str(e)}")
+        return APIResponse.json_error("500", "空间索引不可用", status_code=500)
+    return jsonify(APIResponse.success([
+        {**country, "href": url_for('api.country_resource', code=country['id'])} for country in countries
+    ]))
+
+
+@bp.route('/countries/topology', methods=['GET'])
+def world_topology_endpoint():
+    """
+    返回全部国家的世界TopoJSON（相邻国家共享边界弧线，坐标量化+差分编码）
+    - 在数据更新时生成；支持detail几何精细度参数
+    - 强ETag由生成时间派生，支持If-None-Match → 304
+    """
+    detail, error = _parse_detail()
+    if error:
+        return error
+
+    valid, data = CountryService.get_world_topology_payload(detail)
+    if not valid:
+        return jsonify(data), int(data['error']['code'])
+    return data.to_response(max_age=current_app.config['COUNTRY_CACHE_MAX_AGE'])
+
+
 @bp.route('/update', methods=['GET'])
 def update_endpoint():
     """
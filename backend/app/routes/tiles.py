@@ -0,0 +1,43 @@
+import click
+from flask import Blueprint, Response, current_app, request
+from app.services.vector_tiles import vector_tiles
+from app.utils.api_response import APIResponse
+
+bp = Blueprint('tiles', __name__, cli_group='tiles')
+
+MVT_MIMETYPE = 'application/vnd.mapbox-vector-tile'
+
+
+@bp.route('/tiles/<int:z>/<int:x>/<int:y>.mvt', methods=['GET'])
+def tile_endpoint(z, x, y):
+    """
+    国家边界矢量瓦片（Mapbox Vector Tile，图层名 countries，属性 id/name）
+    - 由Natural Earth Shapefile按缩放级别裁剪、简化生成，首次渲染后缓存到磁盘
+    """
+    if not vector_tiles.available():
+        return APIResponse.json_error("501", "矢量瓦片不可用", "mapbox_vector_tile is not installed", status_code=501)
+    if not vector_tiles.is_valid_tile(z, x, y):
+        return APIResponse.json_error("404", "瓦片不存在", status_code=404)
+
+    try:
+        tile = vector_tiles.get_tile(z, x, y)
+    except Exception as e:
+        current_app.logger.error(f"Tile {z}/{x}/{y} render failed: {str(e)}")
+        return APIResponse.json_error("500", "瓦片生成失败", status_code=500)
+
+    response = Response(tile, mimetype=MVT_MIMETYPE)
+    response.add_etag()
+    response.cache_control.public = True
+    response.cache_control.max_age = current_app.config['TILE_CACHE_MAX_AGE']
+    return response.make_conditional(request)
+
+
+@bp.cli.command('seed')
+@click.option('--min-zoom', default=0, show_default=True, help='最小缩放级别')
+@click.option('--max-zoom', default=5, show_default=True, help='最大缩放级别')
+def seed_command(min_zoom, max_zoom):
+    """预生成指定缩放级别范围内的全部矢量瓦片"""
+    if not vector_tiles.available():
+        raise click.ClickException("mapbox_vector_tile is not installed")
+    rendered = vector_tiles.seed(min_zoom, min(max_zoom, current_app.config['TILE_MAX_ZOOM']))
+    click.echo(f"Rendered {rendered} tiles into {vector_tiles.cache_dir}")
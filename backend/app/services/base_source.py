@@ -6,8 +6,10 @@ from ..utils.api_client import APIClient
 logger = logging.getLogger(__name__)
 
 class BaseDataSource(ABC):
+    CACHE_TTL = 0  # API响应磁盘缓存的新鲜期(秒)，0为不缓存；子类按数据源的更新频率设置
+
     def __init__(self):
-        self.client = APIClient()
+        self.client = APIClient(cache_ttl=self.CACHE_TTL)
     
     @abstractmethod
     def fetch_data(self, country_code: str = None) -> Dict[str, Any]:
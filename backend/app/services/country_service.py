@@ -1,16 +1,23 @@
-from cerberus import Validator
-from app.schemas.country import country_schema
+from app.utils.fast_validator import FastValidator
+from app.schemas.country import country_schema, COUNTRY_SCHEMA_VERSION
 from app import db
-from app.models import Country, Demographic
+from app.models import Country, CountryNeighbor, CountryReadModel, WorldTopology
 from app.utils.api_response import APIResponse
 from app.services.data_updater import DataUpdater
-import random
+from app.services.country_sampler import country_sampler
+from app.services.payload_cache import CachedPayload, payload_cache
+from app.services.country_payload import CountryPayloadBuilder, FieldSelection
+from app.utils.validator import RequestValidator
 from sqlalchemy import func
+import threading
+
+# 逐国更新后世界TopoJSON延迟到读取时重建，同一时间只重建一次
+_world_topology_lock = threading.Lock()
 
 class CountryService:
     @staticmethod
     def validate_country_data(input_data: dict) -> tuple:
-        validator = Validator(country_schema)
+        validator = FastValidator(country_schema)
         if not validator.validate(input_data):
             print("Cerberus validation errors:", validator.errors)
             return False, validator.errors
@@ -30,6 +37,7 @@ class CountryService:
             print(f"Status: {result['status']}")
             print(f"Total Countries: {result['total']}")
             print(f"Updated Successfully: {result['updated']}")
+            print(f"Skipped (unchanged): {result.get('skipped', 0)}")
             print(f"Failed: {result['failed']}")
 
             # 如果有失败的国家，打印详细信息
@@ -50,176 +58,213 @@ class CountryService:
     def get_country() -> tuple[bool, dict]:
         flag, country = CountryService.get_random_country_by_birth_weight()
         if flag:
-            valid, data = CountryService.validate_country_data(country)
-            if valid:
-                return True, APIResponse.success(data)
-            else:
-                return False, APIResponse.error("400", "Invalid country data", str(data))
+            return True, APIResponse.success(country)
         else:
             return False, country # 返回错误信息
-    
+
     @staticmethod
-    def get_country_data(country_code: str) -> tuple[bool, dict]:
-        """获取国家完整数据 (ORM实现)"""
-        # 使用SQLAlchemy查询国家数据（自动关联关系）
-        country = Country.query.filter_by(id=country_code.upper()).first()
-        print("coordinates:", country.longitude, country.latitude if country else "N/A")
-        print("coordinates(float):", float(country.longitude) if country and country.longitude else "N/A", float(country.latitude) if country and country.latitude else "N/A")
-        
-        if not country:
-            return False, APIResponse.error("404", "国家数据不存在")
-        
-        try:
-            # 构建响应数据
-            return True, {
-                    "id": country.id,
-                    "name": country.name,
-                    "population": country.population,
-                    "capital": country.capital,
-                    "location": {
-                        "type": "Point",
-                        "coordinates": [float(country.longitude), float(country.latitude)] if country.longitude is not None and country.latitude is not None else [None, None]
-                    },
-                    "geoJson": CountryService._format_geojson(country.geojson),
-                    "storySeed": CountryService._format_story_seed(country)
-                }
-        except Exception as e:
-            print(f"Error formatting country data: {str(e)}")
-            return False, APIResponse.error("500", "服务器错误，无法格式化国家数据")
-    
+    def get_country_payload(detail: str = "full", geo_format: str = "geojson") -> tuple[bool, object]:
+        """
+        加权随机选择国家，返回预序列化的响应体(CachedPayload)
+        - 命中缓存时只需一次O(1)抽样，不访问数据库
+        - 未命中时构建、校验并序列化后写入缓存（timestamp为构建时间）
+        - detail: 几何精细度(low/medium/full)；geo_format: 几何输出格式(geojson/topojson)，各组合分别缓存
+        """
+        entry = country_sampler.sample()
+        if not entry:
+            return False, APIResponse.error("500", "没有可用的国家数据")
+        return CountryService._get_cached_payload(*entry, detail, geo_format)
+
     @staticmethod
-    def _format_geojson(geojson_data):
-        """格式化地理数据"""
-        if not geojson_data:
-            return {"type": "FeatureCollection", "features": []}
-        
-        return geojson_data.coordinates
-    
+    def pick_random_country_id() -> tuple[bool, object]:
+        """只做加权随机抽样，返回国家代码（供客户端再请求可缓存的单国家资源）"""
+        entry = country_sampler.sample()
+        if not entry:
+            return False, APIResponse.error("500", "没有可用的国家数据")
+        return True, entry[0]
+
     @staticmethod
-    def _format_story_seed(country):
-        """格式化故事种子数据"""
-        if not country:
-            return None
-            
-        return {
-            "demographics": CountryService._format_demographics(country.demographics),
-            "education": CountryService._format_education(country.education),
-            "environment": CountryService._format_environment(country),
-            "milestones": CountryService._format_milestones(country.milestones),
-            "historicalEvents": CountryService._format_events(country.events)
-        }
-    
-    # ------------------------------
-    # 以下为内部格式化辅助方法
-    # ------------------------------
+    def get_country_payload_by_code(country_code: str, detail: str = "full", geo_format: str = "geojson") -> tuple[bool, object]:
+        """按国家代码返回预序列化的响应体(CachedPayload)"""
+        country_code = country_code.upper()
+        version = CountryService.get_country_version(country_code)
+        if version is None:
+            return False, APIResponse.error("404", "国家数据不存在")
+        return CountryService._get_cached_payload(country_code, version, detail, geo_format)
+
     @staticmethod
-    def _format_demographics(demographics):
-        if not demographics:
+    def get_country_version(country_code: str):
+        """国家数据版本：优先取抽样表中的记录，不在表中(如人口为0)时查询数据库"""
+        version = country_sampler.get_version(country_code)
+        if version is not None:
+            return version
+
+        updated_at = db.session.query(
+            func.coalesce(CountryReadModel.updated_at, Country.updated_at)
+        ).select_from(Country).outerjoin(
+            CountryReadModel,
+            Country.id == CountryReadModel.country_id
+        ).filter(Country.id == country_code).first()
+        if updated_at is None:
             return None
-        return {
-            "gender_ratio": float(demographics.gender_ratio) if demographics.gender_ratio is not None else None,
-            "urban_ratio": float(demographics.urban_ratio) if demographics.urban_ratio is not None else None,
-            "median_age": demographics.median_age
-        }
-    
+        return country_sampler.format_version(updated_at[0])
+
     @staticmethod
-    def _format_education(education):
-        if not education:
-            return None
-        return {
-            "school_start_age": education.school_start_age,
-            "high_school_rate": float(education.high_school_rate) if education.high_school_rate is not None else None,
-            "university_rate": float(education.university_rate) if education.university_rate is not None else None
-        }
-    
+    def _get_cached_payload(country_id: str, version: str, detail: str = "full", geo_format: str = "geojson") -> tuple[bool, object]:
+        key = (country_id, version, detail, geo_format)
+        cached = payload_cache.get(key)
+        if cached:
+            return True, cached
+
+        flag, data = CountryService.get_validated_country_data(country_id, detail, geo_format)
+        if not flag:
+            return False, data
+
+        cached = CachedPayload.from_data(APIResponse.success(data), key)
+        payload_cache.put(key, cached)
+        return True, cached
+
     @staticmethod
-    def _format_environment(country):
-        if not country.economy:
-            return None
-        return {
-            "gdp_per_capita": float(country.economy.gdp_per_capita) if country.economy.gdp_per_capita is not None else None,
-            "internet_penetration": float(country.economy.internet_penetration) if country.economy.internet_penetration is not None else None,
-            "main_industries": [i.industry_name for i in country.industries]
-        }
-    
+    def get_country_neighbors(country_code: str) -> tuple[bool, object]:
+        """返回陆地接壤的国家列表（更新时预先计算的邻接表，一次索引查询）"""
+        country_code = country_code.upper()
+        if db.session.get(Country, country_code) is None:
+            return False, APIResponse.error("404", "国家数据不存在")
+
+        rows = db.session.query(Country.id, Country.name).join(
+            CountryNeighbor, CountryNeighbor.neighbor_id == Country.id
+        ).filter(CountryNeighbor.country_id == country_code).order_by(Country.id).all()
+        return True, [{"id": row.id, "name": row.name} for row in rows]
+
     @staticmethod
-    def _format_milestones(milestones):
-        if not milestones:
-            return None
-        return {
-            "avg_marriage_age": milestones.avg_marriage_age,
-            "avg_first_child_age": milestones.avg_first_child_age,
-            "life_expectancy": milestones.life_expectancy
-        }
-    
+    def get_world_topology_payload(detail: str = "full") -> tuple[bool, object]:
+        """返回更新时生成的世界TopoJSON（预序列化，版本为生成时间）；逐国更新后已过期的先重建"""
+        if DataUpdater.world_topology_stale():
+            with _world_topology_lock:
+                if DataUpdater.world_topology_stale():
+                    DataUpdater.refresh_world_topology()
+
+        updated_at = db.session.query(WorldTopology.updated_at).filter(WorldTopology.detail == detail).scalar()
+        if updated_at is None:
+            return False, APIResponse.error("404", "世界拓扑数据尚未生成")
+
+        key = ("world", country_sampler.format_version(updated_at), detail, "topojson")
+        cached = payload_cache.get(key)
+        if cached:
+            return True, cached
+
+        topology = db.session.query(WorldTopology.topology).filter(WorldTopology.detail == detail).scalar()
+        cached = CachedPayload.from_data(APIResponse.success(topology), key)
+        payload_cache.put(key, cached)
+        return True, cached
+
+    @staticmethod
+    def get_validated_country_data(country_code: str, detail: str = "full", geo_format: str = "geojson") -> tuple[bool, dict]:
+        """获取通过schema校验的国家数据（写入时已按当前schema校验的读模型行直接返回）"""
+        row = db.session.get(CountryReadModel, country_code.upper())
+        if row and row.schema_version == COUNTRY_SCHEMA_VERSION:
+            return True, CountryPayloadBuilder.from_read_model(row, detail, geo_format)
+
+        flag, country = CountryService.get_country_data(country_code, detail)
+        if not flag:
+            return False, country
+        valid, data = CountryService.validate_country_data(country)
+        if not valid:
+            return False, APIResponse.error("400", "Invalid country data", str(data))
+        if geo_format == "topojson":
+            data = CountryPayloadBuilder.with_topojson(data, country_code.upper())
+        return True, data
+
+    @staticmethod
+    def get_countries_data(country_codes: list, fields: FieldSelection = None, detail: str = "full",
+                           geo_format: str = "geojson") -> dict:
+        """
+        批量获取通过校验的国家数据，返回 {国家代码: 数据}
+        - 读模型一次 IN 查询；缺失或未校验的国家再用一次带预加载的 IN 查询实时构建
+        - 指定fields时只查询被请求的列/JSONB片段，实时构建时也只加载所需的关系
+        - 不存在或校验失败的国家不出现在结果中
+        """
+        codes = list(dict.fromkeys(c.upper() for c in country_codes))
+        result = {}
+        pending = []
+        if fields is None:
+            for row in CountryReadModel.query.filter(CountryReadModel.country_id.in_(codes)).all():
+                if row.schema_version == COUNTRY_SCHEMA_VERSION:
+                    result[row.country_id] = CountryPayloadBuilder.from_read_model(row, detail, geo_format)
+                else:
+                    pending.append(row.country_id)
+        else:
+            rows = db.session.query(
+                CountryReadModel.country_id,
+                CountryReadModel.schema_version,
+                *fields.columns(detail, geo_format)
+            ).filter(CountryReadModel.country_id.in_(codes)).all()
+            for row in rows:
+                # TopoJSON尚未生成的行(如升级前写入)走实时构建
+                if row.schema_version == COUNTRY_SCHEMA_VERSION and getattr(row, "topo_json", True) is not None:
+                    result[row.country_id] = fields.from_row(row)
+                else:
+                    pending.append(row.country_id)
+        pending.extend(c for c in codes if c not in result and c not in pending)
+
+        if pending:
+            loads = CountryPayloadBuilder.EAGER_LOADS if fields is None else fields.eager_loads()
+            schema = country_schema if fields is None else fields.schema(country_schema)
+            countries = Country.query.options(*loads).filter(Country.id.in_(pending)).all()
+            for country in countries:
+                valid, data = RequestValidator.validate(schema, CountryPayloadBuilder.build(country, fields, detail))
+                if valid:
+                    data = data if fields is None else fields.apply(data)
+                    result[country.id] = CountryPayloadBuilder.with_topojson(data, country.id) if geo_format == "topojson" else data
+                else:
+                    print("Cerberus validation errors:", data)
+        return result
+
+    @staticmethod
+    def get_random_countries(count: int, fields: FieldSelection = None, detail: str = "full",
+                             geo_format: str = "geojson") -> tuple[bool, object]:
+        """按权重有放回地抽取count个国家，返回数据列表（顺序与抽样顺序一致）"""
+        ids = []
+        for _ in range(count):
+            entry = country_sampler.sample()
+            if not entry:
+                return False, APIResponse.error("500", "没有可用的国家数据")
+            ids.append(entry[0])
+
+        countries = CountryService.get_countries_data(ids, fields, detail, geo_format)
+        return True, [countries[i] for i in ids if i in countries]
+
     @staticmethod
-    def _format_events(events):
-        if not events:
-            return []
-        # 按年份倒序排序
-        sorted_events = sorted(events, key=lambda x: x.event_year, reverse=True)
-        return [
-            {
-                "name": e.event_name,
-                "year": e.event_year,
-                "impact": e.impact_type
-            } for e in sorted_events
-        ]
+    def get_country_data(country_code: str, detail: str = "full") -> tuple[bool, dict]:
+        """获取国家完整数据（优先读取物化读模型，一次主键查询）"""
+        country_code = country_code.upper()
+        row = db.session.get(CountryReadModel, country_code)
+        if row:
+            return True, CountryPayloadBuilder.from_read_model(row, detail)
+
+        # 读模型尚未生成（如首次更新前），回退到ORM实时构建
+        country = Country.query.options(*CountryPayloadBuilder.EAGER_LOADS).filter_by(id=country_code).first()
+        if not country:
+            return False, APIResponse.error("404", "国家数据不存在")
+        
+        try:
+            return True, CountryPayloadBuilder.build(country, detail=detail)
+        except Exception as e:
+            print(f"Error formatting country data: {str(e)}")
+            return False, APIResponse.error("500", "服务器错误，无法格式化国家数据")
     
     @staticmethod
     def get_random_country_by_birth_weight() -> tuple[bool, dict]:
-        """按出生率×总人口加权随机选择国家"""
+        """按出生率×总人口加权随机选择国家（别名表O(1)抽样）"""
         try:
-            # 1. 查询国家基础数据和出生率（处理缺失值）
-            countries_data = db.session.query(
-                Country.id, 
-                Country.name,
-                Country.population,
-                func.coalesce(Demographic.birth_rate, 15.0).label('adjusted_birth_rate')  # 缺失值用15.0替代
-            ).outerjoin(  # 使用outerjoin确保即使没有demographics记录也能查询到国家
-                Demographic, 
-                Country.id == Demographic.country_id
-            ).filter(
-                Country.population > 0,  # 确保人口数据有效
-                func.coalesce(Demographic.birth_rate, 15.0) > 0  # 确保出生率有效
-            ).all()
-
-            if not countries_data:
+            entry = country_sampler.sample()
+            if not entry:
                 return False, APIResponse.error("500", "没有可用的国家数据")
+            selected_country_id, _ = entry
 
-            # 2. 计算权重（出生率×总人口）并提取国家信息
-            country_ids = []
-            weights = []
-            country_info = {}
-            
-            for item in countries_data:
-                country_id = item.id
-                # 计算权重：出生率(‰) × 总人口(人) → 转换为以万为单位避免数值过大
-                weight = (float(item.adjusted_birth_rate) / 1000) * item.population / 10000
-                
-                country_ids.append(country_id)
-                weights.append(weight)
-                country_info[country_id] = {
-                    "name": item.name,
-                    "population": item.population,
-                    "birth_rate": float(item.adjusted_birth_rate),
-                    "weight": weight
-                }
-
-            # 3. 按权重随机选择国家
-            selected_country_id = random.choices(
-                population=country_ids,
-                weights=weights,
-                k=1
-            )[0]
-
-            # 4. 记录选择日志（可选）
-            selected = country_info[selected_country_id]
-            print(f"随机选择结果: {selected['name']} (权重: {selected['weight']:.2f}万新生儿当量)")
-
-            # 5. 返回选中国家的完整数据
-            return CountryService.get_country_data(selected_country_id)
+            # 返回选中国家的完整数据（已校验）
+            return CountryService.get_validated_country_data(selected_country_id)
             
         except Exception as e:
             print(f"随机选择国家失败: {str(e)}")
-            return False, APIResponse.error("500", "随机选择国家时发生错误")
\ No newline at end of file
+            return False, APIResponse.error("500", "随机选择国家时发生错误")
@@ -0,0 +1,96 @@
+import threading
+from typing import Any, Dict, List, Optional
+import shapely
+from shapely.geometry import box, shape
+from shapely.strtree import STRtree
+from app.config import Config
+from app.utils.geometry import to_polygonal
+from app.utils.logging import get_logger
+from .naturalearth import NaturalEarthSource
+
+logger = get_logger(__name__)
+
+
+class CountrySpatialIndex:
+    """
+    国家边界的空间索引（经纬度，STRtree）
+    - 几何来自Natural Earth Shapefile，首次查询时构建
+    - 几何预先prepare，包围盒与中心点预先计算，单次查询不做额外几何运算
+    """
+
+    def __init__(self, resolution: str = None):
+        self.resolution = resolution or Config.SPATIAL_INDEX_RESOLUTION
+        self._tree: Optional[STRtree] = None
+        self._geometries: List[Any] = []
+        self._entries: List[Dict[str, Any]] = []
+        self._lock = threading.Lock()
+
+    def country_at(self, lon: float, lat: float) -> Optional[Dict[str, Any]]:
+        """返回包含该点的国家（边界上的点也算），不在任何国家内时返回None"""
+        tree = self._get_tree()
+        for i in tree.query(shapely.points(lon, lat)):
+            if shapely.intersects_xy(self._geometries[i], lon, lat):
+                return self._entries[i]
+        return None
+
+    def countries_in_bbox(self, min_lon: float, min_lat: float, max_lon: float, max_lat: float) -> List[Dict[str, Any]]:
+        """返回与包围盒相交的国家（min_lon > max_lon 表示跨越180°经线）"""
+        tree = self._get_tree()
+        if min_lon > max_lon:
+            boxes = [box(min_lon, min_lat, 180.0, max_lat), box(-180.0, min_lat, max_lon, max_lat)]
+        else:
+            boxes = [box(min_lon, min_lat, max_lon, max_lat)]
+
+        found = set()
+        for query_box in boxes:
+            found.update(tree.query(query_box, predicate="intersects").tolist())
+        return sorted((self._entries[i] for i in found), key=lambda e: e["id"])
+
+    def invalidate(self):
+        """丢弃索引，下次查询时重新构建"""
+        with self._lock:
+            self._tree = None
+
+    def _get_tree(self) -> STRtree:
+        if self._tree is None:
+            with self._lock:
+                if self._tree is None:
+                    self._build()
+        return self._tree
+
+    def _build(self):
+        source = NaturalEarthSource()
+        geometries, entries = [], []
+        try:
+            for feature in source.iter_country_features(self.resolution):
+                try:
+                    geometry = shape(feature["geometry"])
+                    if not geometry.is_valid:
+                        geometry = to_polygonal(shapely.make_valid(geometry))
+                except Exception as e:
+                    logger.warning(f"Skipping invalid geometry for {feature['properties'].get('name')}: {str(e)}")
+                    continue
+
+                shapely.prepare(geometry)
+                centroid = geometry.representative_point() if not geometry.centroid.within(geometry) else geometry.centroid
+                props = feature["properties"]
+                geometries.append(geometry)
+                entries.append({
+                    "id": props.get("country_id") or "",
+                    "name": props.get("name") or "",
+                    "bbox": [round(v, 6) for v in geometry.bounds],
+                    "centroid": [round(centroid.x, 6), round(centroid.y, 6)]
+                })
+        finally:
+            source.close()
+
+        if not geometries:
+            raise RuntimeError(f"No country geometries available for resolution {self.resolution}")
+
+        self._geometries, self._entries = geometries, entries
+        self._tree = STRtree(geometries)
+        logger.info(f"Built country spatial index for {len(geometries)} countries ({self.resolution})")
+
+
+# 进程内共享的空间索引实例
+country_spatial_index = CountrySpatialIndex()
@@ -1,24 +1,32 @@
 from .base_source import BaseDataSource
-from typing import Dict, Any, Optional, List
+from typing import Dict, Any, Optional, List, Iterator, Tuple
 import logging
-import requests
 import zipfile
-import io
 import os
+import shutil
+import tempfile
+import threading
 from pathlib import Path
 import json
+import numpy as np
 import shapefile  # 新增：导入pyshp库解析Shapefile
 from shapely.geometry import shape  # 新增：处理几何数据
 from shapely.geometry.base import BaseGeometry
 from shapely.errors import TopologicalError
+from app.config import Config
 from app.utils.data_utils import normalize_country_code
+from .geometry_store import GeometryStore, StoreRecord, geometry_stores
 
 logger = logging.getLogger(__name__)
 
+# Shapefile几何记录：(几何类型, 各部分起始下标, N×2坐标数组)
+ShapeArrays = Tuple[int, Optional[np.ndarray], Optional[np.ndarray]]
+
 class NaturalEarthSource(BaseDataSource):
     BASE_URL = "https://naturalearth.s3.amazonaws.com"
     CHINA_URL = "https://geo.datav.aliyun.com/areas_v3/bound/100000.json"
     CACHE_DIR = Path("app/static/shapefile_cache")  # 修改：缓存目录重命名为shapefile_cache
+    _download_lock = threading.Lock()
     
     def fetch_data(self, country_code: Optional[str] = None, resolution: str = "110m") -> Dict[str, Any]:
         """获取国家边界数据（从Shapefile解析）"""
@@ -37,11 +45,11 @@ class NaturalEarthSource(BaseDataSource):
             if country_code.upper() == "CN":
                 # 特例：中国使用GeoJSON数据源
                 try:
-                    response = requests.get(self.CHINA_URL)
-                    response.raise_for_status()
-                    print("HTTP状态码:", response.status_code)  # 应显示200
-                    print("响应前100字符:", response.text[:100])  # 查看实际返回内容
-                    return response.json().get("features", {})[0]  # 返回中国的GeoJSON数据
+                    # 经APIClient请求（录制/回放模式下同样记录）
+                    data = self.client.get(self.CHINA_URL)
+                    if not data:
+                        raise ValueError("empty response")
+                    return data.get("features", {})[0]  # 返回中国的GeoJSON数据
                 except Exception as e:
                     logger.error(f"获取中国GeoJSON数据失败: {str(e)}")
                     return {}
@@ -62,46 +70,100 @@ class NaturalEarthSource(BaseDataSource):
         if all((self.CACHE_DIR / f"{base_filename}{ext}").exists() for ext in required_extensions):
             return str(shp_path)
         
-        # 缓存不存在，下载并解压Shapefile
-        if not self._download_and_extract_shapefile(zip_url, base_filename):
-            return None
+        # 缓存不存在，下载并解压Shapefile（并发抓取时只由一个线程下载）
+        with self._download_lock:
+            if all((self.CACHE_DIR / f"{base_filename}{ext}").exists() for ext in required_extensions):
+                return str(shp_path)
+            if not self._download_and_extract_shapefile(zip_url, base_filename, Config.NATURALEARTH_SHA256.get(resolution)):
+                return None
             
         return str(shp_path)
     
-    def _download_and_extract_shapefile(self, url: str, base_filename: str) -> bool:
-        """下载并解压Shapefile文件集"""
+    def _download_and_extract_shapefile(self, url: str, base_filename: str, sha256: Optional[str] = None) -> bool:
+        """下载并解压Shapefile文件集（压缩包流式写入缓存目录，中断后可续传）"""
         logger.info(f"Downloading Shapefile from {url}")
+        zip_path = self.CACHE_DIR / f"{base_filename}.zip"
         try:
-            response = self.client.get(url, stream=True)
-            response.raise_for_status()
-            
-            # 解压所有文件到缓存目录
-            with zipfile.ZipFile(io.BytesIO(response.content)) as z:
+            if not self.client.download(url, zip_path, sha256=sha256):
+                return False
+
+            # 直接从磁盘读取压缩包，不整体载入内存
+            with zipfile.ZipFile(zip_path) as z:
                 # 验证Shapefile必需文件是否存在
                 required_files = [f"{base_filename}{ext}" for ext in ['.shp', '.shx', '.dbf']]
                 if not all(file in z.namelist() for file in required_files):
                     logger.error("Shapefile缺少必需文件(.shp, .shx, .dbf)")
+                    zip_path.unlink()
                     return False
-                
-                # 解压所有文件
-                z.extractall(self.CACHE_DIR)
+
+                # 校验压缩包内各文件的CRC32
+                corrupted = z.testzip()
+                if corrupted:
+                    logger.error(f"Shapefile压缩包已损坏: {corrupted}")
+                    zip_path.unlink()
+                    return False
+
+                # 先解压到临时目录再逐个重命名，.shp最后就位，避免中断时留下不完整的文件集
+                tmp_dir = Path(tempfile.mkdtemp(prefix=f".{base_filename}.", dir=self.CACHE_DIR))
+                try:
+                    z.extractall(tmp_dir)
+                    names = sorted((n for n in z.namelist() if '/' not in n), key=lambda n: n.endswith('.shp'))
+                    for name in names:
+                        os.replace(tmp_dir / name, self.CACHE_DIR / name)
+                finally:
+                    shutil.rmtree(tmp_dir, ignore_errors=True)
                 logger.info(f"Shapefile解压完成，保存至{self.CACHE_DIR}")
-                return True
+
+            zip_path.unlink()
+            return True
+        except zipfile.BadZipFile as e:
+            logger.error(f"Shapefile压缩包无效: {str(e)}")
+            zip_path.unlink(missing_ok=True)
+            return False
         except Exception as e:
             logger.error(f"Shapefile下载/解压失败: {str(e)}")
             return False
     
-    def _extract_all_countries(self, shp_path: str) -> Dict[str, Any]:
-        """从Shapefile提取所有国家数据，转换为GeoJSON FeatureCollection"""
+    def iter_country_features(self, resolution: str = "110m") -> Iterator[Dict[str, Any]]:
+        """逐个产出Shapefile中所有国家的GeoJSON Feature（供矢量瓦片等批量处理使用）"""
+        self.CACHE_DIR.mkdir(parents=True, exist_ok=True)
+        shp_path = self._get_shapefile_path(resolution)
+        if not shp_path:
+            return
+
+        for properties, *polygon in self._get_store(shp_path):
+            country_feature = self._create_country_feature(properties, tuple(polygon))
+            if country_feature:
+                yield country_feature
+
+    def _get_store(self, shp_path: str) -> GeometryStore:
+        """Shapefile对应的持久化几何存储（首次使用时解析Shapefile构建，之后按校验和复用）"""
+        base = Path(shp_path).with_suffix('')
+        source_paths = [str(base.with_suffix(ext)) for ext in ('.shp', '.shx', '.dbf')]
+        return geometry_stores.get_or_build(
+            self.CACHE_DIR / "geometry_store", base.name, source_paths,
+            lambda: self._store_records(shp_path)
+        )
+
+    def _store_records(self, shp_path: str) -> Iterator[StoreRecord]:
+        """解析Shapefile，产出写入几何存储的记录"""
+        sf = shapefile.Reader(shp_path, encoding='latin-1')  # 处理编码问题
         try:
-            sf = shapefile.Reader(shp_path, encoding='latin-1')  # 处理编码问题
             fields = [f[0] for f in sf.fields[1:]]  # 获取属性字段名（排除删除标记字段）
-            features = []
-            
-            # 遍历所有国家记录
-            for record, shape in zip(sf.iterRecords(), sf.iterShapes()):
+            for record, (shape_type, parts, points) in zip(sf.iterRecords(), self._iter_polygons(shp_path)):
                 attributes = dict(zip(fields, record))
-                country_feature = self._create_country_feature(attributes, shape)
+                # Natural Earth使用ISO_A2作为2位国家代码，ISO_A3作为3位代码
+                codes = [c for c in (attributes.get('ISO_A2'), attributes.get('ISO_A3'), self._country_code(attributes)) if c and c != '-99']
+                yield codes, self._feature_properties(attributes), shape_type, parts, points
+        finally:
+            sf.close()
+
+    def _extract_all_countries(self, shp_path: str) -> Dict[str, Any]:
+        """从几何存储读取所有国家数据，转换为GeoJSON FeatureCollection"""
+        try:
+            features = []
+            for properties, *polygon in self._get_store(shp_path):
+                country_feature = self._create_country_feature(properties, tuple(polygon))
                 if country_feature:
                     features.append(country_feature)
             
@@ -114,81 +176,128 @@ class NaturalEarthSource(BaseDataSource):
             return {}
     
     def _extract_country(self, shp_path: str, country_code: str) -> Dict[str, Any]:
-        """从Shapefile提取单个国家数据"""
+        """从几何存储按国家代码读取单个国家数据（O(1)定位，无需扫描Shapefile）"""
         try:
-            sf = shapefile.Reader(shp_path, encoding='latin-1')
-            fields = [f[0] for f in sf.fields[1:]]
-            
-            # 遍历记录查找匹配国家代码的记录
-            for record, shape in zip(sf.iterRecords(), sf.iterShapes()):
-                attributes = dict(zip(fields, record))
-                # Natural Earth使用ISO_A2作为2位国家代码，ISO_A3作为3位代码
-                if attributes.get('ISO_A2') == country_code or attributes.get('ISO_A3') == country_code:
-                    return self._create_country_feature(attributes, shape)
-            
-            logger.warning(f"国家代码 {country_code} 未在Shapefile中找到")
-            return {}
+            entry = self._get_store(shp_path).get(country_code)
+            if entry is None:
+                logger.warning(f"国家代码 {country_code} 未在Shapefile中找到")
+                return {}
+            properties, *polygon = entry
+            return self._create_country_feature(properties, tuple(polygon))
         except Exception as e:
             logger.error(f"提取国家 {country_code} 数据失败: {str(e)}")
             return {}
     
-    def _create_country_feature(self, attributes: Dict[str, Any], shape: shapefile.Shape) -> Optional[Dict[str, Any]]:
-        """将Shapefile记录转换为GeoJSON Feature"""
+    def _create_country_feature(self, properties: Dict[str, Any], polygon: ShapeArrays) -> Optional[Dict[str, Any]]:
+        """将几何存储中的记录转换为GeoJSON Feature"""
         try:
-            # 转换Shapefile几何对象为GeoJSON格式
-            geometry = self._shape_to_geojson(shape)
+            # 转换Shapefile几何数据为GeoJSON格式
+            geometry = self._polygon_to_geojson(polygon)
             if not geometry:
-                logger.warning(f"无法解析几何数据: {attributes.get('NAME')}")
+                logger.warning(f"无法解析几何数据: {properties.get('name')}")
                 return None
             
             # 构建Feature对象
             return {
                 "type": "Feature",
-                "properties": {
-                    "country_id": attributes.get('ISO_A2') or attributes.get('ISO_A3', ''),
-                    "name": attributes.get('NAME', ''),
-                    "official_name": attributes.get('NAME_OFF', ''),
-                    "iso_a2": attributes.get('ISO_A2', ''),
-                    "iso_a3": attributes.get('ISO_A3', ''),
-                    "region": attributes.get('REGION_WB', ''),  # 世界银行区域分类
-                    "population": attributes.get('POP_EST', 0),  # 估计人口
-                    "area_km2": attributes.get('AREA_KM2', 0)  # 面积（平方公里）
-                },
+                "properties": dict(properties),
                 "geometry": geometry
             }
         except Exception as e:
-            logger.error(f"转换国家数据失败: {str(e)}，属性数据: {attributes}")
+            logger.error(f"转换国家数据失败: {str(e)}，属性数据: {properties}")
             return None
     
-    def _shape_to_geojson(self, shape: shapefile.Shape) -> Optional[Dict[str, Any]]:
-        """将Shapefile几何对象转换为GeoJSON几何格式"""
+    def _feature_properties(self, attributes: Dict[str, Any]) -> Dict[str, Any]:
+        """Shapefile属性 → Feature属性"""
+        return {
+            "country_id": self._country_code(attributes),
+            "name": attributes.get('NAME', ''),
+            "official_name": attributes.get('NAME_OFF', ''),
+            "iso_a2": attributes.get('ISO_A2', ''),
+            "iso_a3": attributes.get('ISO_A3', ''),
+            "region": attributes.get('REGION_WB', ''),  # 世界银行区域分类
+            "population": attributes.get('POP_EST', 0),  # 估计人口
+            "area_km2": attributes.get('AREA_KM2', 0)  # 面积（平方公里）
+        }
+
+    @staticmethod
+    def _country_code(attributes: Dict[str, Any]) -> str:
+        """国家代码：ISO_A2优先；Natural Earth对部分国家(如法国、挪威)将ISO_A2标为-99，此时使用ISO_A2_EH"""
+        for field in ('ISO_A2', 'ISO_A2_EH', 'ISO_A3'):
+            code = attributes.get(field)
+            if code and code != '-99':
+                return code
+        return attributes.get('ISO_A2') or attributes.get('ISO_A3', '')
+
+    @staticmethod
+    def _iter_polygons(shp_path: str) -> Iterator[ShapeArrays]:
+        """
+        按记录顺序读取.shp中的几何数据，产出 (几何类型, parts数组, points数组)
+        - 直接从文件字节构造NumPy数组（按.shx中的偏移定位记录），不为每个顶点创建Python对象
+        - 非多边形记录的parts/points为None
+        """
+        data = Path(shp_path).read_bytes()
+        index = Path(shp_path).with_suffix('.shx').read_bytes()
+        # .shx：100字节文件头后，每条记录8字节（大端序的偏移与长度，单位为16位字）
+        offsets = np.frombuffer(index, dtype='>i4', offset=100).reshape(-1, 2)[:, 0].astype(np.int64) * 2
+
+        for offset in offsets.tolist():
+            content = offset + 8  # 跳过记录头
+            shape_type = int(np.frombuffer(data, dtype='<i4', count=1, offset=content)[0])
+            if shape_type not in (shapefile.POLYGON, shapefile.POLYGONZ, shapefile.POLYGONM):
+                yield shape_type, None, None
+                continue
+            # 多边形记录：类型(4) + 包围盒(32) + 部分数(4) + 点数(4) + parts + points(x, y)
+            num_parts, num_points = np.frombuffer(data, dtype='<i4', count=2, offset=content + 36).tolist()
+            parts = np.frombuffer(data, dtype='<i4', count=num_parts, offset=content + 44)
+            points = np.frombuffer(data, dtype='<f8', count=num_points * 2, offset=content + 44 + 4 * num_parts)
+            yield shape_type, parts.astype(np.intp), points.reshape(-1, 2)
+
+    @staticmethod
+    def _polygon_to_geojson(polygon: ShapeArrays) -> Optional[Dict[str, Any]]:
+        """
+        将Shapefile多边形数组转换为GeoJSON几何格式（NumPy批量处理）
+        - Shapefile中外环为顺时针、内环(洞)为逆时针，洞归属于其前面最近的外环
+        - 输出遵循RFC 7946：外环逆时针、内环顺时针；坐标按GEOMETRY_PRECISION取整
+        """
+        shape_type, parts, points = polygon
         try:
-            # 处理多边形（单个多边形或多个部分组成的多边形）
-            if shape.shapeType in [shapefile.POLYGON, shapefile.POLYGONZ]:
-                # 检查是否有多个部分（即是否是多部分多边形）
-                if len(shape.parts) > 1:
-                    # 处理多部分多边形（如国家包含多个岛屿）
-                    polygons = []
-                    parts = list(shape.parts) + [len(shape.points)]  # 确保parts是列表
-                    for i in range(len(parts) - 1):
-                        start_idx = parts[i]
-                        end_idx = parts[i+1]
-                        # 确保每个多边形部分是列表的列表
-                        polygon_part = [list(map(list, shape.points[start_idx:end_idx]))]
-                        polygons.append(polygon_part)
-                    return {"type": "MultiPolygon", "coordinates": polygons}
-                else:
-                    # 单一部分的多边形
-                    return {
-                        "type": "Polygon",
-                        "coordinates": [list(map(list, shape.points))]  # 转换为列表的列表
-                    }
-
-            # 其他几何类型（点、线等，暂不支持）
-            else:
-                logger.warning(f"不支持的几何类型: {shape.shapeType}")
+            if points is None:
+                logger.warning(f"不支持的几何类型: {shape_type}")
+                return None
+            if len(points) < 4 or len(parts) == 0:
+                return None
+
+            points = np.round(points, Config.GEOMETRY_PRECISION)
+
+            # 各环的有向面积(×2)：相邻点叉积按环求和，跨环的项置零
+            cross = points[:-1, 0] * points[1:, 1] - points[1:, 0] * points[:-1, 1]
+            cross = np.append(cross, 0.0)
+            cross[parts[1:] - 1] = 0.0
+            areas = np.add.reduceat(cross, parts)
+
+            rings = np.split(points, parts[1:])
+            is_exterior = areas < 0
+            if not is_exterior.any():
+                is_exterior[:] = True  # 方向不规范的数据：全部视为外环
+
+            polygons: List[List[np.ndarray]] = []
+            for ring, area, exterior in zip(rings, areas, is_exterior):
+                if len(ring) < 4:
+                    continue
+                if exterior:
+                    polygons.append([ring if area > 0 else ring[::-1]])
+                elif polygons:
+                    polygons[-1].append(ring if area < 0 else ring[::-1])
+            if not polygons:
                 return None
 
+            # 最后一步才用 tolist() 一次性转换为嵌套列表
+            coordinates = [[ring.tolist() for ring in part] for part in polygons]
+            if len(coordinates) == 1:
+                return {"type": "Polygon", "coordinates": coordinates[0]}
+            return {"type": "MultiPolygon", "coordinates": coordinates}
+
         except Exception as e:
             logger.error(f"几何数据转换失败: {str(e)}")
-            return None
\ No newline at end of file
+            return None
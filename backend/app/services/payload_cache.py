@@ -0,0 +1,104 @@
+import gzip
+import hashlib
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, Optional, Tuple
+from flask import Response, current_app, request
+from app.config import Config
+from app.utils.logging import get_logger
+
+try:
+    import brotli  # 可选依赖：未安装时只提供identity/gzip两种编码
+except ImportError:
+    brotli = None
+
+logger = get_logger(__name__)
+
+
+class CachedPayload:
+    """已序列化的响应体，附带预压缩的gzip/brotli版本"""
+
+    def __init__(self, body: bytes, etag: str):
+        self.body = body
+        self.etag = etag  # 由缓存键（国家代码、数据版本、几何精细度与输出格式）派生的强ETag（未压缩版本）
+        self.gzip = gzip.compress(body, compresslevel=9)
+        self.br = brotli.compress(body, quality=9) if brotli else None
+
+    @classmethod
+    def from_data(cls, data: Dict[str, Any], key: Tuple[str, ...]) -> "CachedPayload":
+        """按应用的JSON配置序列化（与jsonify输出一致）"""
+        etag = hashlib.sha1(":".join(key).encode("utf-8")).hexdigest()[:20]
+        return cls((current_app.json.dumps(data) + "\n").encode("utf-8"), etag)
+
+    @property
+    def size(self) -> int:
+        return len(self.body) + len(self.gzip) + (len(self.br) if self.br else 0)
+
+    def to_response(self, status: int = 200, max_age: Optional[int] = None) -> Response:
+        """
+        根据Accept-Encoding选择预压缩版本输出
+        - 指定max_age时作为可缓存资源输出：带强ETag与Cache-Control，支持If-None-Match → 304
+        """
+        accept = request.accept_encodings
+        if self.br and accept["br"]:
+            body, encoding = self.br, "br"
+        elif accept["gzip"]:
+            body, encoding = self.gzip, "gzip"
+        else:
+            body, encoding = self.body, None
+
+        response = Response(body, status=status, mimetype="application/json")
+        if encoding:
+            response.headers["Content-Encoding"] = encoding
+        response.vary.add("Accept-Encoding")
+
+        if max_age is not None:
+            # 每种编码是不同的字节表示，强ETag需要区分
+            response.set_etag(f"{self.etag}-{encoding}" if encoding else self.etag)
+            response.cache_control.public = True
+            response.cache_control.max_age = max_age
+            response.make_conditional(request)
+        return response
+
+
+class PayloadCache:
+    """按总字节数限制的LRU缓存，键为 (国家代码或"world", 数据版本, 几何精细度, 输出格式)"""
+
+    def __init__(self, max_bytes: int):
+        self.max_bytes = max_bytes
+        self._entries: "OrderedDict[Hashable, CachedPayload]" = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+
+    def get(self, key: Hashable) -> Optional[CachedPayload]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+            return entry
+
+    def put(self, key: Hashable, entry: CachedPayload):
+        if entry.size > self.max_bytes:
+            logger.warning(f"Payload for {key} ({entry.size} bytes) exceeds cache limit, not cached")
+            return
+
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self._bytes -= old.size
+            self._entries[key] = entry
+            self._bytes += entry.size
+
+            # 淘汰最久未使用的条目直到满足字节上限
+            while self._bytes > self.max_bytes:
+                _, evicted = self._entries.popitem(last=False)
+                self._bytes -= evicted.size
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+
+# 进程内共享的响应缓存实例
+payload_cache = PayloadCache(Config.PAYLOAD_CACHE_MAX_BYTES)
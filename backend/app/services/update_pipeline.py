@@ -0,0 +1,179 @@
+import asyncio
+import contextvars
+import queue
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from time import perf_counter
+from typing import Any, Awaitable, Callable, Dict, Iterable, List, Optional, Tuple
+from app.config import Config
+from app.utils.async_fetch import AsyncFetcher
+from app.utils.logging import get_logger
+
+logger = get_logger(__name__)
+
+_DONE = object()  # 阶段结束标记
+
+
+class PipelineStopped(Exception):
+    """写入阶段已终止，上游阶段停止生产"""
+
+
+class StageTimer:
+    """单个阶段的计时：处理条数、处理耗时、等待耗时（上游为空或下游队列已满）"""
+
+    def __init__(self):
+        self.items = 0
+        self.busy = 0.0
+        self.waiting = 0.0
+
+    def as_dict(self) -> Dict[str, float]:
+        return {"items": self.items, "busy_seconds": round(self.busy, 3), "waiting_seconds": round(self.waiting, 3)}
+
+
+class UpdatePipeline:
+    """
+    数据更新的三段流水线：fetch → transform → write
+    - fetch：在事件循环中并发抓取（AsyncFetcher，按主机限流）；事件循环运行在独立的生产线程中，
+      因此 run() 在已有运行中事件循环的线程（如Flask异步视图）中调用也不会出错
+    - transform：在线程池中做不依赖数据库的CPU处理（如几何编码）
+    - write：在调用 run() 的线程中按批写库（每批最多 batch_size 条；数据库会话与应用上下文绑定在该线程）
+    - 阶段间为有界队列：写库慢时队列写满，上游阶段随之阻塞（背压），内存占用有上限
+    - 某条数据在 fetch/transform 中抛出的异常会作为结果传给 write，由其记录失败
+    """
+
+    def __init__(
+        self,
+        fetch: Callable[[AsyncFetcher, Any], Awaitable[Any]],
+        transform: Callable[[Any, Any], Any],
+        write_batch: Callable[[List[Tuple[Any, Any]]], None],
+        batch_size: int = 50,
+        queue_size: Optional[int] = None,
+        fetch_workers: Optional[int] = None,
+        transform_workers: Optional[int] = None
+    ):
+        self.fetch = fetch
+        self.transform = transform
+        self.write_batch = write_batch
+        self.batch_size = batch_size
+        self.queue_size = queue_size or Config.PIPELINE_QUEUE_SIZE
+        self.fetch_workers = fetch_workers or Config.FETCH_CONCURRENCY
+        self.transform_workers = transform_workers or Config.PIPELINE_TRANSFORM_WORKERS
+
+    def run(self, items: Iterable[Any]) -> Dict[str, Dict[str, float]]:
+        """处理全部数据，返回各阶段计时"""
+        timers = {stage: StageTimer() for stage in ("fetch", "transform", "write")}
+        write_queue: queue.Queue = queue.Queue(maxsize=self.queue_size)
+        stop = threading.Event()
+        errors = []
+
+        def produce():
+            try:
+                # 新线程中没有事件循环，asyncio.run 不会与调用方线程的事件循环冲突
+                asyncio.run(self._produce(items, write_queue, timers, stop))
+            except PipelineStopped:
+                pass
+            except BaseException as e:
+                errors.append(e)
+            finally:
+                self._put(write_queue, _DONE, stop)
+
+        # 生产线程在调用方上下文的副本中运行（新线程不继承contextvars，如本次运行的请求总时限）
+        producer = threading.Thread(target=contextvars.copy_context().run, args=(produce,), name="update-pipeline", daemon=True)
+        producer.start()
+        try:
+            batch, finished = [], False
+            while not finished:
+                # 攒满一批（或上游结束）再写入，攒批期间上游阶段照常运行
+                start = perf_counter()
+                entry = write_queue.get()
+                timers["write"].waiting += perf_counter() - start
+                if entry is _DONE:
+                    finished = True
+                else:
+                    batch.append(entry)
+                if batch and (finished or len(batch) >= self.batch_size):
+                    start = perf_counter()
+                    self.write_batch(batch)
+                    timers["write"].busy += perf_counter() - start
+                    timers["write"].items += len(batch)
+                    batch = []
+        finally:
+            stop.set()
+            producer.join()
+
+        if errors:
+            raise errors[0]
+        stats = {stage: timer.as_dict() for stage, timer in timers.items()}
+        logger.info(f"Update pipeline stage timings: {stats}")
+        return stats
+
+    async def _produce(self, items: Iterable[Any], write_queue: queue.Queue, timers: Dict[str, StageTimer], stop: threading.Event):
+        transform_queue: asyncio.Queue = asyncio.Queue(maxsize=self.queue_size)
+        pending = iter(items)  # 各fetch协程共享同一迭代器（同一事件循环线程内，无需加锁）
+        loop = asyncio.get_running_loop()
+
+        async with AsyncFetcher(max_workers=self.fetch_workers) as fetcher:
+            with ThreadPoolExecutor(max_workers=self.transform_workers, thread_name_prefix="transform") as executor:
+                async def fetch_worker():
+                    timer = timers["fetch"]
+                    for item in pending:
+                        start = perf_counter()
+                        try:
+                            fetched = await self.fetch(fetcher, item)
+                        except Exception as e:
+                            fetched = e
+                        timer.busy += perf_counter() - start
+                        timer.items += 1
+                        start = perf_counter()
+                        await transform_queue.put((item, fetched))
+                        timer.waiting += perf_counter() - start
+
+                async def transform_worker():
+                    timer = timers["transform"]
+                    while True:
+                        start = perf_counter()
+                        entry = await transform_queue.get()
+                        timer.waiting += perf_counter() - start
+                        if entry is _DONE:
+                            return
+                        item, fetched = entry
+                        start = perf_counter()
+                        if isinstance(fetched, Exception):
+                            transformed = fetched
+                        else:
+                            try:
+                                transformed = await loop.run_in_executor(executor, self.transform, item, fetched)
+                            except Exception as e:
+                                transformed = e
+                        timer.busy += perf_counter() - start
+                        timer.items += 1
+                        start = perf_counter()
+                        if not await asyncio.to_thread(self._put, write_queue, (item, transformed), stop):
+                            raise PipelineStopped()
+                        timer.waiting += perf_counter() - start
+
+                fetchers = [asyncio.create_task(fetch_worker()) for _ in range(self.fetch_workers)]
+                transformers = [asyncio.create_task(transform_worker()) for _ in range(self.transform_workers)]
+
+                async def close_transform_queue():
+                    await asyncio.gather(*fetchers)
+                    for _ in transformers:
+                        await transform_queue.put(_DONE)
+
+                try:
+                    # 与transform协程一起等待：transform因写入阶段终止而退出时立即结束，不会卡在已满的队列上
+                    await asyncio.gather(close_transform_queue(), *transformers)
+                finally:
+                    for task in fetchers + transformers:
+                        task.cancel()
+
+    @staticmethod
+    def _put(target: queue.Queue, entry: Any, stop: threading.Event) -> bool:
+        """阻塞写入有界队列（背压）；写入阶段已终止时放弃并返回False"""
+        while not stop.is_set():
+            try:
+                target.put(entry, timeout=0.5)
+                return True
+            except queue.Full:
+                continue
+        return False
@@ -0,0 +1,153 @@
+import math
+import os
+import threading
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+import numpy as np
+import shapely
+from shapely.geometry import box, shape
+from shapely.strtree import STRtree
+from app.config import Config
+from app.utils.geometry import to_polygonal
+from app.utils.logging import get_logger
+from .naturalearth import NaturalEarthSource
+
+try:
+    import mapbox_vector_tile  # 可选依赖：未安装时瓦片接口返回501
+except ImportError:
+    mapbox_vector_tile = None
+
+logger = get_logger(__name__)
+
+# Web Mercator (EPSG:3857)
+EARTH_RADIUS = 6378137.0
+WORLD_HALF_SIZE = math.pi * EARTH_RADIUS
+MAX_LATITUDE = 85.0511287798
+
+TILE_EXTENT = 4096
+TILE_BUFFER = 64          # 裁剪缓冲(瓦片坐标单位)，避免相邻瓦片接缝处出现描边
+SIMPLIFY_UNITS = 2        # 简化容差(瓦片坐标单位)，随缩放级别自动变化
+LAYER_NAME = "countries"
+
+
+def _project(coords: np.ndarray) -> np.ndarray:
+    """经纬度 → Web Mercator 米（向量化）"""
+    lon = coords[:, 0]
+    lat = np.clip(coords[:, 1], -MAX_LATITUDE, MAX_LATITUDE)
+    x = np.radians(lon) * EARTH_RADIUS
+    y = np.log(np.tan(np.pi / 4 + np.radians(lat) / 2)) * EARTH_RADIUS
+    return np.column_stack((x, y))
+
+
+def tile_bounds(z: int, x: int, y: int) -> Tuple[float, float, float, float]:
+    """XYZ瓦片在Web Mercator下的范围 (minx, miny, maxx, maxy)"""
+    size = 2 * WORLD_HALF_SIZE / (1 << z)
+    minx = -WORLD_HALF_SIZE + x * size
+    maxy = WORLD_HALF_SIZE - y * size
+    return minx, maxy - size, minx + size, maxy
+
+
+class VectorTileService:
+    """
+    由Natural Earth Shapefile生成Mapbox矢量瓦片(MVT)
+    - 国家几何首次使用时投影到Web Mercator并建立STRtree索引
+    - 每个瓦片按范围裁剪、按缩放级别简化后编码，首次渲染后缓存到磁盘
+    """
+
+    def __init__(self, resolution: str = None, cache_dir: str = None):
+        self.resolution = resolution or Config.TILE_SOURCE_RESOLUTION
+        self.cache_dir = Path(cache_dir or Config.TILE_CACHE_DIR) / self.resolution
+        self._index: Optional[Tuple[STRtree, List[Dict[str, Any]], List[Any]]] = None
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def available() -> bool:
+        return mapbox_vector_tile is not None
+
+    @staticmethod
+    def is_valid_tile(z: int, x: int, y: int) -> bool:
+        return 0 <= z <= Config.TILE_MAX_ZOOM and 0 <= x < (1 << z) and 0 <= y < (1 << z)
+
+    def get_tile(self, z: int, x: int, y: int) -> bytes:
+        """读取磁盘缓存的瓦片，未命中时渲染并写入缓存"""
+        path = self.cache_dir / str(z) / str(x) / f"{y}.mvt"
+        try:
+            return path.read_bytes()
+        except FileNotFoundError:
+            pass
+
+        tile = self.render_tile(z, x, y)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        # 先写临时文件再原子替换，避免并发请求读到写了一半的瓦片
+        tmp_path = path.with_suffix(f".{os.getpid()}.{threading.get_ident()}.tmp")
+        tmp_path.write_bytes(tile)
+        os.replace(tmp_path, path)
+        return tile
+
+    def render_tile(self, z: int, x: int, y: int) -> bytes:
+        """渲染单个瓦片（空瓦片也会编码为合法的MVT）"""
+        tree, properties, geometries = self._get_index()
+        bounds = tile_bounds(z, x, y)
+        size = bounds[2] - bounds[0]
+        buffer = size * TILE_BUFFER / TILE_EXTENT
+        clip = box(bounds[0] - buffer, bounds[1] - buffer, bounds[2] + buffer, bounds[3] + buffer)
+        tolerance = size * SIMPLIFY_UNITS / TILE_EXTENT
+
+        features = []
+        for i in tree.query(clip, predicate="intersects"):
+            geometry = to_polygonal(geometries[i].intersection(clip).simplify(tolerance, preserve_topology=True))
+            if geometry.is_empty:
+                continue
+            features.append({"geometry": geometry, "properties": properties[i]})
+
+        return mapbox_vector_tile.encode(
+            [{"name": LAYER_NAME, "features": features}],
+            default_options={"quantize_bounds": bounds, "extents": TILE_EXTENT}
+        )
+
+    def seed(self, min_zoom: int = 0, max_zoom: int = 5) -> int:
+        """预生成 [min_zoom, max_zoom] 范围内的全部瓦片，返回新渲染的瓦片数"""
+        rendered = 0
+        for z in range(min_zoom, max_zoom + 1):
+            for x in range(1 << z):
+                for y in range(1 << z):
+                    if not (self.cache_dir / str(z) / str(x) / f"{y}.mvt").exists():
+                        self.get_tile(z, x, y)
+                        rendered += 1
+            logger.info(f"Seeded zoom {z} ({rendered} tiles rendered so far)")
+        return rendered
+
+    def _get_index(self):
+        if self._index is None:
+            with self._lock:
+                if self._index is None:
+                    self._index = self._build_index()
+        return self._index
+
+    def _build_index(self):
+        source = NaturalEarthSource()
+        properties, geometries = [], []
+        try:
+            for feature in source.iter_country_features(self.resolution):
+                try:
+                    geometry = shapely.transform(shape(feature["geometry"]), _project)
+                    if not geometry.is_valid:
+                        geometry = to_polygonal(shapely.make_valid(geometry))
+                except Exception as e:
+                    logger.warning(f"Skipping invalid geometry for {feature['properties'].get('name')}: {str(e)}")
+                    continue
+                props = feature["properties"]
+                properties.append({"id": props.get("country_id") or "", "name": props.get("name") or ""})
+                geometries.append(geometry)
+        finally:
+            source.close()
+
+        if not geometries:
+            # 数据源不可用时不建立索引，避免把空瓦片写入磁盘缓存
+            raise RuntimeError(f"No country geometries available for resolution {self.resolution}")
+        logger.info(f"Built vector tile index for {len(geometries)} countries ({self.resolution})")
+        return STRtree(geometries), properties, geometries
+
+
+# 进程内共享的瓦片服务实例
+vector_tiles = VectorTileService()
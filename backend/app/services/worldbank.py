@@ -1,45 +1,96 @@
 from .base_source import BaseDataSource
-from typing import Dict, Any
+from ..config import Config
+from typing import Dict, Any, Optional
 import logging
 
 logger = logging.getLogger(__name__)
 
 class WorldBankSource(BaseDataSource):
     BASE_URL = "https://api.worldbank.org/v2"
-    
+    CACHE_TTL = Config.WORLDBANK_CACHE_TTL
+    BULK_PAGE_SIZE = 1000  # 批量接口每页条数（配合mrnev=1，每个国家/地区一条，一页即可取完）
+
+    INDICATORS = {
+        "economy": {
+            "gdp": "NY.GDP.PCAP.CD",  # 人均GDP
+            "gdp_growth": "NY.GDP.MKTP.KD.ZG",  # GDP增长率
+            "internet_penetration": "IT.NET.USER.ZS"  # 新增：互联网普及率
+        },
+        "demographics": {
+            "urban_population": "SP.URB.TOTL.IN.ZS",  # 城市人口比例
+            "life_expectancy": "SP.DYN.LE00.IN",  # 预期寿命
+            "birth_rate": "SP.DYN.CBRT.IN",           # 出生率 (每千人)
+            "median_age": "SP.POP.TOTL.MA.ZS",         # 中位年龄
+            "gender_ratio": "SP.POP.BRTH.MF"      # 女性比例
+        },
+        "education": {
+            "literacy_rate": "SE.ADT.LITR.ZS"  # 识字率
+        }
+    }
+
     def fetch_data(self, country_code: str) -> Dict[str, Any]:
-        """获取世界银行数据"""
+        """获取单个国家的世界银行数据（各指标取最近一个非空值）"""
         self._log_fetch("World Bank", country_code)
-        
-        indicators = {
-            "economy": {
-                "gdp": "NY.GDP.PCAP.CD",  # 人均GDP
-                "gdp_growth": "NY.GDP.MKTP.KD.ZG",  # GDP增长率
-                "internet_penetration": "IT.NET.USER.ZS"  # 新增：互联网普及率
-            },
-            "demographics": {
-                "urban_population": "SP.URB.TOTL.IN.ZS",  # 城市人口比例
-                "life_expectancy": "SP.DYN.LE00.IN",  # 预期寿命
-                "birth_rate": "SP.DYN.CBRT.IN",           # 出生率 (每千人)
-                "median_age": "SP.POP.TOTL.MA.ZS",         # 中位年龄
-                "gender_ratio": "SP.POP.BRTH.MF"      # 女性比例
-            },
-            "education": {
-                "literacy_rate": "SE.ADT.LITR.ZS"  # 识字率
-            }
-        }
-        
+
         result = {"country_id": country_code}
-        
-        for category, inds in indicators.items():
+
+        for category, inds in self.INDICATORS.items():
             result[category] = {}
             for key, indicator in inds.items():
                 try:
                     url = f"{self.BASE_URL}/country/{country_code}/indicator/{indicator}"
-                    data = self.client.get(url, params={"format": "json", "per_page": 1})
+                    data = self.client.get(url, params={"format": "json", "per_page": 1, "mrnev": 1})
                     if data and len(data) > 1 and data[1]:
                         result[category][key] = data[1][0].get("value")
                 except Exception as e:
                     logger.warning(f"Failed to fetch {indicator} for {country_code}: {str(e)}")
-        
-        return result
\ No newline at end of file
+
+        return result
+
+    def fetch_all(self) -> Dict[str, Dict[str, Any]]:
+        """
+        批量获取所有国家的世界银行数据：每个指标请求一次 country/all（分页），
+        返回 {国家代码(ISO2): 与fetch_data相同结构的数据}；任一指标失败时返回空字典，由调用方回退到逐国获取
+        """
+        self._log_fetch("World Bank (bulk)")
+
+        result: Dict[str, Dict[str, Any]] = {}
+        for category, inds in self.INDICATORS.items():
+            for key, indicator in inds.items():
+                values = self._fetch_indicator_values(indicator)
+                if values is None:
+                    return {}
+                for country_code, value in values.items():
+                    country = result.setdefault(country_code, {
+                        "country_id": country_code, **{c: {} for c in self.INDICATORS}
+                    })
+                    country[category][key] = value
+
+        logger.info(f"Fetched World Bank indicators for {len(result)} countries/regions")
+        return result
+
+    def _fetch_indicator_values(self, indicator: str) -> Optional[Dict[str, Any]]:
+        """单个指标所有国家的最近非空值 {ISO2: value}，请求失败时返回None"""
+        url = f"{self.BASE_URL}/country/all/indicator/{indicator}"
+        params = {"format": "json", "per_page": self.BULK_PAGE_SIZE, "mrnev": 1, "page": 1}
+        values: Dict[str, Any] = {}
+        dates: Dict[str, str] = {}
+
+        while True:
+            data = self.client.get(url, params=params)
+            if not data or not isinstance(data, list) or len(data) < 2 or not isinstance(data[0], dict):
+                logger.warning(f"Bulk fetch of {indicator} failed on page {params['page']}")
+                return None
+
+            for row in data[1] or []:
+                country_code = (row.get("country") or {}).get("id")
+                value, date = row.get("value"), row.get("date") or ""
+                if not country_code or value is None:
+                    continue
+                # mrnev=1时每个国家只有一条；防御性地只保留年份最新的非空值
+                if country_code not in values or date > dates[country_code]:
+                    values[country_code], dates[country_code] = value, date
+
+            if int(data[0].get("page") or 1) >= int(data[0].get("pages") or 1):
+                return values
+            params["page"] += 1
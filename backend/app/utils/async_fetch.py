@@ -0,0 +1,54 @@
+import asyncio
+import contextvars
+import functools
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, Optional
+from urllib.parse import urlparse
+from ..config import Config
+from .logging import get_logger
+
+logger = get_logger(__name__)
+
+
+def host_of(url: str) -> str:
+    """URL的主机名（作为并发限制的分组键）"""
+    return urlparse(url).netloc or url
+
+
+class AsyncFetcher:
+    """
+    asyncio抓取层：在线程池中执行数据源的同步请求（APIClient/requests），
+    按主机限制同时进行的请求数；所有数据源共享同一传输层（http_transport），连接池复用已建立的连接
+
+    用法:
+        async with AsyncFetcher() as fetcher:
+            data = await fetcher.call("api.worldbank.org", source.fetch_data, "CN")
+    """
+
+    def __init__(self, max_workers: Optional[int] = None, per_host: Optional[int] = None):
+        self.max_workers = max_workers or Config.FETCH_CONCURRENCY
+        self.per_host = per_host or Config.FETCH_CONCURRENCY_PER_HOST
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._semaphores: Dict[str, asyncio.Semaphore] = {}
+
+    async def __aenter__(self) -> "AsyncFetcher":
+        self._executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="fetch")
+        return self
+
+    async def __aexit__(self, *exc_info):
+        self._executor.shutdown(wait=True)
+        self._executor = None
+
+    async def call(self, host: str, func: Callable[..., Any], *args) -> Any:
+        """
+        在线程池中执行 func(*args)，同一主机的并发数不超过 per_host
+        run_in_executor 不传递 contextvars，func 在复制的当前上下文中执行（如本次运行的请求总时限）
+        """
+        semaphore = self._semaphores.get(host)
+        if semaphore is None:
+            semaphore = self._semaphores[host] = asyncio.Semaphore(self.per_host)
+        context = contextvars.copy_context()
+        async with semaphore:
+            return await asyncio.get_running_loop().run_in_executor(
+                self._executor, functools.partial(context.run, func, *args)
+            )
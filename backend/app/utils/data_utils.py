@@ -1,6 +1,7 @@
 from typing import Dict, Any, List
 from datetime import datetime
 from decimal import Decimal
+import hashlib
 import json
 
 def normalize_country_code(code: Any) -> str:
@@ -37,4 +38,18 @@ def merge_dicts(base: Dict, update: Dict) -> Dict:
             merge_dicts(base[key], value)
         else:
             base[key] = value
-    return base
\ No newline at end of file
+    return base
+
+def file_checksum(*paths: str) -> str:
+    """多个文件内容的SHA-256（按顺序拼接，分块读取）"""
+    digest = hashlib.sha256()
+    for path in paths:
+        with open(path, "rb") as f:
+            for chunk in iter(lambda: f.read(1 << 20), b""):
+                digest.update(chunk)
+    return digest.hexdigest()
+
+def content_hash(data: Any) -> str:
+    """数据内容的SHA-256（JSON规范化后计算，字典键顺序不影响结果；Decimal等按字符串处理）"""
+    encoded = json.dumps(data, sort_keys=True, separators=(",", ":"), ensure_ascii=False, default=str)
+    return hashlib.sha256(encoded.encode("utf-8")).hexdigest()
@@ -0,0 +1,337 @@
+import copy
+import re
+from collections.abc import Iterable, Mapping, Sequence, Sized
+from typing import Any, Callable, Dict, Optional, Tuple
+from cerberus import Validator
+
+try:
+    import numpy as np  # 随shapely安装；缺失时坐标数组退回纯Python循环校验
+except ImportError:
+    np = None
+
+
+class UnsupportedSchemaError(Exception):
+    """schema中包含编译器不支持的规则，需要退回cerberus"""
+
+
+# 与cerberus 1.3 的 types_mapping 保持一致
+_TYPE_CHECKS: Dict[str, Callable[[Any], bool]] = {
+    'boolean': lambda v: isinstance(v, bool),
+    'dict': lambda v: isinstance(v, Mapping),
+    'float': lambda v: isinstance(v, (float, int)),
+    'integer': lambda v: isinstance(v, int),
+    'list': lambda v: isinstance(v, Sequence) and not isinstance(v, str),
+    'number': lambda v: isinstance(v, (int, float)) and not isinstance(v, bool),
+    'string': lambda v: isinstance(v, str),
+}
+
+_SUPPORTED_RULES = {
+    'type', 'required', 'empty', 'min', 'max', 'allowed', 'nullable', 'schema',
+    'items', 'minlength', 'maxlength', 'oneof', 'default', 'regex'
+}
+
+# 坐标数组长度达到该值时使用NumPy整体校验
+_NUMPY_MIN_POINTS = 16
+
+Check = Callable[[Any], bool]
+Normalize = Callable[[Any], Any]
+
+
+def _is_list_rules(rules: Dict[str, Any]) -> bool:
+    return rules.get('type') == 'list'
+
+
+def _is_dict_rules(rules: Dict[str, Any]) -> bool:
+    return rules.get('type') == 'dict'
+
+
+# ------------------------------
+# 校验函数编译
+# ------------------------------
+def _compile_mapping(schema: Dict[str, Any]) -> Check:
+    """编译字段schema为映射校验函数（不允许未知字段，同cerberus默认行为）"""
+    fields = {name: _compile_rules(rules) for name, rules in schema.items()}
+    required = [name for name, rules in schema.items() if rules.get('required')]
+
+    def check(doc: Mapping) -> bool:
+        for name in required:
+            if name not in doc:
+                return False
+        for name, value in doc.items():
+            field_check = fields.get(name)
+            if field_check is None or not field_check(value):
+                return False
+        return True
+
+    return check
+
+
+def _compile_rules(rules: Dict[str, Any]) -> Check:
+    """编译单个字段的规则集为校验函数"""
+    unsupported = set(rules) - _SUPPORTED_RULES
+    if unsupported:
+        raise UnsupportedSchemaError(f"Unsupported rules: {sorted(unsupported)}")
+
+    nullable = rules.get('nullable', False)
+    type_names = rules.get('type')
+    if isinstance(type_names, str):
+        type_names = [type_names]
+    type_checks = None
+    if type_names:
+        try:
+            type_checks = [_TYPE_CHECKS[t] for t in type_names]
+        except KeyError as e:
+            raise UnsupportedSchemaError(f"Unsupported type: {e}")
+
+    empty = rules.get('empty')
+    min_value, max_value = rules.get('min'), rules.get('max')
+    min_length, max_length = rules.get('minlength'), rules.get('maxlength')
+    allowed = rules.get('allowed')
+    regex = re.compile(rules['regex'] if rules['regex'].endswith('$') else rules['regex'] + '$') if 'regex' in rules else None
+    items = [_compile_rules(r) for r in rules['items']] if 'items' in rules else None
+
+    schema_check = None
+    if 'schema' in rules:
+        if _is_dict_rules(rules):
+            mapping_check = _compile_mapping(rules['schema'])
+            schema_check = lambda v: mapping_check(v) if isinstance(v, Mapping) else True
+        elif _is_list_rules(rules):
+            schema_check = _compile_sequence(rules['schema'])
+        else:
+            raise UnsupportedSchemaError("'schema' rule requires type dict or list")
+
+    oneof = None
+    if 'oneof' in rules:
+        base = {k: v for k, v in rules.items() if k != 'oneof'}
+        oneof = [_compile_rules({**base, **definition}) for definition in rules['oneof']]
+
+    def check(value: Any) -> bool:
+        if value is None:
+            # cerberus对None只跳过类型/取值类规则，oneof仍会执行
+            if not nullable:
+                return False
+            return oneof is None or sum(1 for c in oneof if c(value)) == 1
+        if type_checks is not None and not any(t(value) for t in type_checks):
+            return False
+
+        is_empty = isinstance(value, Sized) and len(value) == 0
+        if is_empty and empty is False:
+            return False
+
+        if allowed is not None:
+            if isinstance(value, Iterable) and not isinstance(value, str):
+                if any(v not in allowed for v in value):
+                    return False
+            elif value not in allowed:
+                return False
+        if min_value is not None and value < min_value:
+            return False
+        if max_value is not None and value > max_value:
+            return False
+
+        # cerberus对空容器(empty规则存在时)跳过以下规则
+        if not (is_empty and empty is not None):
+            if min_length is not None and isinstance(value, Sized) and len(value) < min_length:
+                return False
+            if max_length is not None and isinstance(value, Sized) and len(value) > max_length:
+                return False
+            if regex is not None and isinstance(value, str) and not regex.match(value):
+                return False
+            if items is not None and isinstance(value, Sequence):
+                if len(value) != len(items):
+                    return False
+                for item_check, item in zip(items, value):
+                    if not item_check(item):
+                        return False
+
+        if schema_check is not None and not schema_check(value):
+            return False
+        if oneof is not None and sum(1 for c in oneof if c(value)) != 1:
+            return False
+        return True
+
+    return check
+
+
+def _compile_sequence(item_rules: Dict[str, Any]) -> Check:
+    """编译列表元素规则；定长数值元组（如经纬度点）走向量化快速路径"""
+    points_check = _compile_points(item_rules)
+    if points_check is not None:
+        return lambda v: points_check(v) if isinstance(v, Sequence) and not isinstance(v, str) else True
+
+    item_check = _compile_rules(item_rules)
+
+    def check(value: Any) -> bool:
+        if not isinstance(value, Sequence) or isinstance(value, str):
+            return True
+        for item in value:
+            if not item_check(item):
+                return False
+        return True
+
+    return check
+
+
+def _compile_points(item_rules: Dict[str, Any]) -> Optional[Check]:
+    """
+    识别形如 {'type': 'list', 'items': [{'type': 'float', 'min':.., 'max':..}, ...]} 的元素规则，
+    编译为整体校验坐标数组的函数；不符合该形状时返回None
+    """
+    if set(item_rules) - {'type', 'items', 'minlength', 'maxlength'} or not _is_list_rules(item_rules):
+        return None
+    items = item_rules.get('items')
+    if not items or any(set(r) - {'type', 'min', 'max'} or r.get('type') != 'float' for r in items):
+        return None
+    dims = len(items)
+    if item_rules.get('minlength', 0) > dims or item_rules.get('maxlength', dims) < dims:
+        return None
+
+    lows = [r.get('min', float('-inf')) for r in items]
+    highs = [r.get('max', float('inf')) for r in items]
+    bounds = list(zip(lows, highs))
+    np_lows = np.array(lows, dtype=float) if np is not None else None
+    np_highs = np.array(highs, dtype=float) if np is not None else None
+
+    def check_loop(points: Sequence) -> bool:
+        for point in points:
+            if not isinstance(point, Sequence) or isinstance(point, str) or len(point) != dims:
+                return False
+            for v, (low, high) in zip(point, bounds):
+                if not isinstance(v, (float, int)) or v < low or v > high:
+                    return False
+        return True
+
+    def check(points: Sequence) -> bool:
+        if np is not None and len(points) >= _NUMPY_MIN_POINTS:
+            try:
+                arr = np.asarray(points)
+            except (ValueError, TypeError):
+                arr = None
+            # 非规则数组或含非数值元素时交给逐点循环给出准确结论
+            if arr is not None and arr.ndim == 2 and arr.shape[1] == dims and arr.dtype.kind in 'biuf':
+                # 与cerberus一致：NaN不触发min/max错误
+                return not ((arr < np_lows).any() or (arr > np_highs).any())
+        return check_loop(points)
+
+    return check
+
+
+# ------------------------------
+# 规范化函数编译（只处理default规则）
+# ------------------------------
+def _compile_mapping_normalizer(schema: Dict[str, Any]) -> Normalize:
+    defaults = {
+        name: (rules['default'], rules.get('nullable', False))
+        for name, rules in schema.items() if 'default' in rules
+    }
+    children = {}
+    for name, rules in schema.items():
+        child = _compile_field_normalizer(rules)
+        if child is not None:
+            children[name] = child
+
+    def normalize(doc: Mapping) -> Dict[str, Any]:
+        result = dict(doc)
+        for name, (default, nullable) in defaults.items():
+            if name not in result or (result[name] is None and not nullable):
+                result[name] = copy.deepcopy(default)
+        for name, child in children.items():
+            if name in result:
+                result[name] = child(result[name])
+        return result
+
+    return normalize
+
+
+def _compile_field_normalizer(rules: Dict[str, Any]) -> Optional[Normalize]:
+    """字段包含需规范化的子结构时返回规范化函数，否则返回None"""
+    if 'schema' in rules and _is_dict_rules(rules):
+        mapping_normalizer = _compile_mapping_normalizer(rules['schema'])
+        return lambda v: mapping_normalizer(v) if isinstance(v, Mapping) else v
+
+    if 'schema' in rules and _is_list_rules(rules):
+        item_normalizer = _compile_field_normalizer(rules['schema'])
+        if item_normalizer is None:
+            return None
+        return lambda v: [item_normalizer(i) for i in v] if isinstance(v, list) else v
+
+    return None
+
+
+def _has_defaults(rules: Any) -> bool:
+    if isinstance(rules, Mapping):
+        return 'default' in rules or any(_has_defaults(v) for v in rules.values())
+    if isinstance(rules, (list, tuple)):
+        return any(_has_defaults(v) for v in rules)
+    return False
+
+
+class CompiledSchema:
+    """一次编译、可复用的schema（校验函数+规范化函数）"""
+
+    def __init__(self, schema: Dict[str, Any]):
+        self.schema = schema
+        # items/oneof中的default不会被编译器规范化，交给cerberus处理
+        for rules in schema.values():
+            for key in ('items', 'oneof'):
+                if _has_defaults(rules.get(key)):
+                    raise UnsupportedSchemaError(f"'default' inside '{key}' is not supported")
+        self.check = _compile_mapping(schema)
+        self.normalize = _compile_mapping_normalizer(schema)
+
+
+# id(schema) -> (schema, 编译结果)；保留schema引用防止id被复用
+_compiled_schemas: Dict[int, Tuple[Dict[str, Any], Optional[CompiledSchema]]] = {}
+
+
+def compile_schema(schema: Dict[str, Any]) -> Optional[CompiledSchema]:
+    """编译并缓存schema；包含不支持的规则时返回None"""
+    cached = _compiled_schemas.get(id(schema))
+    if cached is None or cached[0] is not schema:
+        try:
+            compiled = CompiledSchema(schema)
+        except UnsupportedSchemaError:
+            compiled = None
+        cached = _compiled_schemas[id(schema)] = (schema, compiled)
+    return cached[1]
+
+
+class FastValidator:
+    """
+    与cerberus.Validator接口兼容的快速校验器
+    - 通过校验时直接返回编译结果，不经过cerberus的逐规则分派
+    - 校验失败时由cerberus重新校验，保证errors格式与cerberus完全一致
+    - normalized()只复制包含default的嵌套结构，其余值（如坐标数组）与输入共享
+    """
+
+    def __init__(self, schema: Dict[str, Any]):
+        self.schema = schema
+        self._compiled = compile_schema(schema)
+        self._validator: Optional[Validator] = None
+        self._last = None  # (原文档, 规范化结果)，供validate后紧接着的normalized复用
+
+    @property
+    def errors(self) -> Dict[str, Any]:
+        return self._validator.errors if self._validator else {}
+
+    def validate(self, document: Dict[str, Any]) -> bool:
+        self._validator = None
+        self._last = None
+        if self._compiled is not None and isinstance(document, Mapping):
+            try:
+                normalized = self._compiled.normalize(document)
+                if self._compiled.check(normalized):
+                    self._last = (document, normalized)
+                    return True
+            except Exception:
+                pass  # 例如min/max比较类型不兼容，交给cerberus处理
+        # 未编译或校验失败：由cerberus给出权威结果与错误信息
+        self._validator = Validator(self.schema)
+        return self._validator.validate(document)
+
+    def normalized(self, document: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        if self._last is not None and self._last[0] is document:
+            return self._last[1]
+        if self._compiled is not None and isinstance(document, Mapping):
+            return self._compiled.normalize(document)
+        return Validator(self.schema).normalized(document)
@@ -0,0 +1,106 @@
+import hashlib
+import json
+import os
+import threading
+from pathlib import Path
+from typing import Any, Dict, Optional
+import requests
+from ..config import Config
+from .logging import get_logger
+
+logger = get_logger(__name__)
+
+
+class HTTPCache:
+    """
+    外部API响应的磁盘缓存（按URL与查询参数区分），进程重启后仍可复用
+    - 每条响应一个JSON文件：解析后的响应体、ETag/Last-Modified与写入时间，先写临时文件再原子替换
+    - 总大小超过上限时按最近使用时间(文件mtime，命中时刷新)淘汰
+    - 新鲜期由调用方（APIClient）判断，过期后用ETag/Last-Modified发送条件请求重新验证
+    """
+
+    def __init__(self, cache_dir: str, max_bytes: int):
+        self.cache_dir = Path(cache_dir)
+        self.max_bytes = max_bytes
+        self._size: Optional[int] = None  # 缓存目录当前总字节数（首次写入时扫描得到）
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def key(url: str, params: Optional[Dict] = None) -> str:
+        """由完整请求URL（查询参数按名称排序）生成缓存键"""
+        if isinstance(params, dict):
+            params = sorted(params.items())
+        full_url = requests.Request("GET", url, params=params).prepare().url
+        return hashlib.sha256(full_url.encode("utf-8")).hexdigest()
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        """读取缓存条目，不存在或已损坏时返回None"""
+        path = self._path(key)
+        try:
+            with open(path, encoding="utf-8") as f:
+                entry = json.load(f)
+            os.utime(path)  # 记录最近使用时间
+        except FileNotFoundError:
+            return None
+        except (OSError, ValueError) as e:
+            logger.warning(f"Discarding unreadable HTTP cache entry {path.name}: {str(e)}")
+            self._remove(path)
+            return None
+        return entry
+
+    def put(self, key: str, entry: Dict[str, Any]):
+        """写入缓存条目，超过总大小上限时淘汰最久未使用的条目"""
+        body = json.dumps(entry, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+        if len(body) > self.max_bytes:
+            return
+        path = self._path(key)
+        tmp_path = path.with_suffix(f".{os.getpid()}.{threading.get_ident()}.tmp")
+        try:
+            self.cache_dir.mkdir(parents=True, exist_ok=True)
+            with self._lock:
+                if self._size is None:
+                    self._size = sum(p.stat().st_size for p in self.cache_dir.glob("*.json"))
+                old_size = path.stat().st_size if path.exists() else 0
+                tmp_path.write_bytes(body)
+                os.replace(tmp_path, path)
+                self._size += len(body) - old_size
+                if self._size > self.max_bytes:
+                    self._evict()
+        except OSError as e:
+            logger.warning(f"Failed to write HTTP cache entry {path.name}: {str(e)}")
+            self._remove(tmp_path)
+
+    def _evict(self):
+        """按最近使用时间淘汰，直到总大小降到上限的90%（重新扫描目录，其他进程的写入也计算在内）"""
+        files = []
+        for p in self.cache_dir.glob("*.json"):
+            try:
+                stat = p.stat()
+            except FileNotFoundError:
+                continue
+            files.append((stat.st_mtime, stat.st_size, p))
+        files.sort()
+        self._size = sum(size for _, size, _ in files)
+        target = int(self.max_bytes * 0.9)
+        removed = 0
+        for _, size, p in files:
+            if self._size <= target:
+                break
+            self._remove(p)
+            self._size -= size
+            removed += 1
+        logger.info(f"Evicted {removed} HTTP cache entries ({self._size} bytes kept)")
+
+    def _path(self, key: str) -> Path:
+        return self.cache_dir / f"{key}.json"
+
+    @staticmethod
+    def _remove(path: Path):
+        try:
+            path.unlink()
+        except OSError:
+            pass
+
+
+# 进程内共享的响应缓存
+http_cache = HTTPCache(Config.HTTP_CACHE_DIR, Config.HTTP_CACHE_MAX_BYTES)
@@ -0,0 +1,197 @@
+import contextvars
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+from typing import Dict, Optional
+import requests
+from requests.adapters import HTTPAdapter
+from ..config import Config
+from .async_fetch import host_of
+from .logging import get_logger
+
+logger = get_logger(__name__)
+
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+# 本次运行的请求总时限（monotonic时间），按上下文隔离，同时进行的多次运行互不影响
+# 其他线程中的请求需在复制的上下文中执行（见 UpdatePipeline.run 与 AsyncFetcher.call）
+_deadline: contextvars.ContextVar[Optional[float]] = contextvars.ContextVar("http_deadline", default=None)
+
+
+class HostUnavailable(requests.exceptions.ConnectionError):
+    """主机的熔断器处于打开状态，请求未发出"""
+
+
+class DeadlineExceeded(requests.exceptions.Timeout):
+    """已超过本次运行的外部请求总时限，请求未发出"""
+
+
+class CircuitBreaker:
+    """
+    单个主机的熔断器
+    - 连续失败（连接错误、超时、5xx）达到阈值后打开，冷却期内的请求立即失败
+    - 冷却期结束后放行一个试探请求：成功则关闭，失败则重新打开
+    """
+
+    def __init__(self, host: str, failure_threshold: int, reset_timeout: float):
+        self.host = host
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.failures = 0
+        self.opened_at: Optional[float] = None
+        self._probing = False
+        self._lock = threading.Lock()
+
+    @property
+    def is_open(self) -> bool:
+        return self.opened_at is not None
+
+    def before_request(self):
+        """请求前检查，熔断中时抛出 HostUnavailable"""
+        with self._lock:
+            if self.opened_at is None:
+                return
+            if self._probing or time.monotonic() - self.opened_at < self.reset_timeout:
+                raise HostUnavailable(f"Circuit open for {self.host}, failing fast")
+            self._probing = True  # 冷却结束，本请求作为试探
+
+    def record_success(self):
+        with self._lock:
+            if self.opened_at is not None:
+                logger.info(f"Circuit closed for {self.host}")
+            self.failures, self.opened_at, self._probing = 0, None, False
+
+    def release(self):
+        """请求因与主机无关的原因失败（如URL无效）：不改变状态，只结束试探"""
+        with self._lock:
+            self._probing = False
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            if self._probing or (self.opened_at is None and self.failures >= self.failure_threshold):
+                logger.warning(f"Circuit opened for {self.host} after {self.failures} consecutive failures")
+                self.opened_at = time.monotonic()
+            self._probing = False
+
+
+class HTTPTransport:
+    """
+    所有数据源共享的HTTP传输层
+    - 一个Session，http/https均挂载连接池，每个主机的连接数与抓取并发数一致
+    - 失败时按指数退避重试；429/503按Retry-After等待（超过上限则不再重试）
+    - 每个主机一个熔断器（进程内共享）；可为一次运行设置总时限（按上下文隔离），超时后的请求立即失败
+    """
+
+    def __init__(self):
+        self.session = requests.Session()
+        adapter = HTTPAdapter(max_retries=0, pool_maxsize=Config.FETCH_CONCURRENCY_PER_HOST)
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+        self._breakers: Dict[str, CircuitBreaker] = {}
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def deadline(self, seconds: Optional[float]):
+        """在此范围内（当前上下文及由其复制的上下文）的请求共享一个总时限"""
+        token = _deadline.set(time.monotonic() + seconds if seconds else None)
+        try:
+            yield
+        finally:
+            _deadline.reset(token)
+
+    def get(self, url: str, retry: bool = True, **kwargs) -> requests.Response:
+        """
+        发送GET请求，返回最后一次的响应（由调用方raise_for_status）
+        retry=False 时不重试（调用方自行处理，如断点续传下载）
+        """
+        breaker = self._breaker(host_of(url))
+        attempts = Config.MAX_RETRIES + 1 if retry else 1
+        for attempt in range(attempts):
+            timeout = self._timeout()
+            breaker.before_request()
+            try:
+                response = self.session.get(url, timeout=timeout, **kwargs)
+            except (requests.exceptions.ConnectionError, requests.exceptions.Timeout) as e:
+                breaker.record_failure()
+                if attempt == attempts - 1 or breaker.is_open:
+                    raise
+                delay = 2 ** attempt
+                logger.warning(f"Request to {url} failed ({str(e)}), retrying in {delay}s")
+            except Exception:
+                breaker.release()
+                raise
+            else:
+                if response.status_code not in RETRY_STATUSES:
+                    breaker.record_success()
+                    return response
+                if response.status_code != 429:
+                    breaker.record_failure()  # 429表示主机正常但限流，不计入熔断
+                retry_after = self._retry_after(response)
+                # 熔断已打开或要求等待过久时不再重试
+                if attempt == attempts - 1 or breaker.is_open or (retry_after or 0) > Config.HTTP_RETRY_AFTER_MAX:
+                    return response
+                delay = retry_after if retry_after is not None else 2 ** attempt
+                response.close()
+                logger.warning(f"Request to {url} returned {response.status_code}, retrying in {delay}s")
+            self._sleep(delay)
+
+    def open_circuits(self):
+        """当前熔断中的主机"""
+        return sorted(host for host, breaker in self._breakers.items() if breaker.is_open)
+
+    def close(self):
+        self.session.close()
+
+    def _breaker(self, host: str) -> CircuitBreaker:
+        breaker = self._breakers.get(host)
+        if breaker is None:
+            with self._lock:
+                breaker = self._breakers.setdefault(host, CircuitBreaker(
+                    host, Config.CIRCUIT_BREAKER_FAILURES, Config.CIRCUIT_BREAKER_RESET
+                ))
+        return breaker
+
+    def _remaining(self) -> Optional[float]:
+        """距总时限的剩余秒数（未设置时限时为None），已超时时抛出 DeadlineExceeded"""
+        deadline = _deadline.get()
+        if deadline is None:
+            return None
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            raise DeadlineExceeded("Run deadline exceeded, failing fast")
+        return remaining
+
+    def _timeout(self):
+        """连接/读取超时，不超过总时限的剩余时间"""
+        connect, read = Config.REQUEST_TIMEOUT
+        remaining = self._remaining()
+        if remaining is None:
+            return connect, read
+        return min(connect, remaining), min(read, remaining)
+
+    def _sleep(self, delay: float):
+        """重试前等待；等待会超过总时限时直接失败"""
+        remaining = self._remaining()
+        if remaining is not None and delay >= remaining:
+            raise DeadlineExceeded("Run deadline would be exceeded before retry, failing fast")
+        time.sleep(delay)
+
+    @staticmethod
+    def _retry_after(response: requests.Response) -> Optional[float]:
+        """解析Retry-After（秒数或HTTP日期），没有或无法解析时返回None"""
+        value = response.headers.get("Retry-After")
+        if not value:
+            return None
+        if value.strip().isdigit():
+            return float(value)
+        try:
+            return max(0.0, (parsedate_to_datetime(value) - datetime.now(timezone.utc)).total_seconds())
+        except (TypeError, ValueError):
+            return None
+
+
+# 进程内共享的HTTP传输层
+http_transport = HTTPTransport()
@@ -0,0 +1,164 @@
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+# 量化精度：每个坐标轴划分为 10^5 个整数格（全球范围约0.4km/格）
+DEFAULT_QUANTIZATION = 100000
+
+Point = Tuple[int, int]
+
+
+def encode_topology(
+    features: Iterable[Tuple[str, Dict[str, Any]]],
+    quantization: int = DEFAULT_QUANTIZATION,
+    object_name: str = "countries"
+) -> Dict[str, Any]:
+    """
+    将 (id, GeoJSON Feature) 序列编码为 TopoJSON Topology
+    - 坐标按整体包围盒量化为整数，弧线按差分(delta)编码
+    - 相邻国家共享的边界只存储一次（通过交汇点切分后按顶点序列去重）
+    """
+    features = [(fid, f) for fid, f in features if f and f.get("geometry")]
+    bbox = _bbox(f["geometry"] for _, f in features)
+    if bbox is None:
+        return _empty_topology(object_name)
+
+    x0, y0, x1, y1 = bbox
+    kx = (x1 - x0) / (quantization - 1) if x1 > x0 else 1.0
+    ky = (y1 - y0) / (quantization - 1) if y1 > y0 else 1.0
+
+    def quantize(ring: List[List[float]]) -> List[Point]:
+        points: List[Point] = []
+        for x, y in ((p[0], p[1]) for p in ring):
+            point = (int(round((x - x0) / kx)), int(round((y - y0) / ky)))
+            if not points or points[-1] != point:
+                points.append(point)
+        if points and points[0] != points[-1]:
+            points.append(points[0])
+        return points
+
+    # 1. 量化全部环
+    quantized = []
+    for fid, feature in features:
+        polygons = _polygons(feature["geometry"])
+        quantized.append((fid, feature, [[quantize(ring) for ring in polygon] for polygon in polygons]))
+
+    # 2. 交汇点：在不同环中拥有不同相邻点的顶点
+    junctions = _find_junctions(ring for _, _, polygons in quantized for polygon in polygons for ring in polygon)
+
+    # 3. 按交汇点切分为弧线并去重
+    arcs: List[List[Point]] = []
+    arc_index: Dict[Tuple[Point, ...], int] = {}
+
+    def add_arc(arc: List[Point]) -> int:
+        key = tuple(arc)
+        if key in arc_index:
+            return arc_index[key]
+        reversed_key = key[::-1]
+        if reversed_key in arc_index:
+            return ~arc_index[reversed_key]  # 反向引用
+        arc_index[key] = len(arcs)
+        arcs.append(arc)
+        return arc_index[key]
+
+    geometries = []
+    for fid, feature, polygons in quantized:
+        polygon_arcs = []
+        for polygon in polygons:
+            rings = [[add_arc(arc) for arc in _cut_ring(ring, junctions)] for ring in polygon if len(ring) >= 4]
+            if rings:
+                polygon_arcs.append(rings)
+        if not polygon_arcs:
+            continue
+        geometry = {"type": "MultiPolygon", "arcs": polygon_arcs} if len(polygon_arcs) > 1 else {"type": "Polygon", "arcs": polygon_arcs[0]}
+        geometry["id"] = fid
+        geometry["properties"] = feature.get("properties") or {}
+        geometries.append(geometry)
+
+    return {
+        "type": "Topology",
+        "bbox": [x0, y0, x1, y1],
+        "transform": {"scale": [kx, ky], "translate": [x0, y0]},
+        "objects": {object_name: {"type": "GeometryCollection", "geometries": geometries}},
+        "arcs": [_delta_encode(arc) for arc in arcs]
+    }
+
+
+def encode_feature_collection(
+    object_id: Optional[str],
+    collection: Optional[Dict[str, Any]],
+    quantization: int = DEFAULT_QUANTIZATION
+) -> Dict[str, Any]:
+    """将单个国家的 FeatureCollection 编码为 TopoJSON"""
+    features = (collection or {}).get("features") or []
+    return encode_topology(((object_id, f) for f in features), quantization, object_name="country")
+
+
+def _empty_topology(object_name: str) -> Dict[str, Any]:
+    return {
+        "type": "Topology",
+        "objects": {object_name: {"type": "GeometryCollection", "geometries": []}},
+        "arcs": []
+    }
+
+
+def _polygons(geometry: Dict[str, Any]) -> List[List[List[List[float]]]]:
+    if geometry.get("type") == "Polygon":
+        return [geometry.get("coordinates") or []]
+    if geometry.get("type") == "MultiPolygon":
+        return geometry.get("coordinates") or []
+    return []
+
+
+def _bbox(geometries: Iterable[Dict[str, Any]]) -> Optional[Tuple[float, float, float, float]]:
+    x0 = y0 = float("inf")
+    x1 = y1 = float("-inf")
+    for geometry in geometries:
+        for polygon in _polygons(geometry):
+            for ring in polygon:
+                for point in ring:
+                    x, y = point[0], point[1]
+                    x0, y0, x1, y1 = min(x0, x), min(y0, y), max(x1, x), max(y1, y)
+    if x0 > x1:
+        return None
+    return x0, y0, x1, y1
+
+
+def _find_junctions(rings: Iterable[List[Point]]) -> set:
+    """顶点在不同位置出现时，若相邻点组合不同则为交汇点（共享边界的起止点）"""
+    neighbors: Dict[Point, frozenset] = {}
+    junctions = set()
+    for ring in rings:
+        n = len(ring) - 1  # 闭合环的最后一点与第一点相同
+        if n < 3:
+            continue
+        for i in range(n):
+            point = ring[i]
+            pair = frozenset((ring[(i - 1) % n], ring[(i + 1) % n]))
+            seen = neighbors.get(point)
+            if seen is None:
+                neighbors[point] = pair
+            elif seen != pair:
+                junctions.add(point)
+    return junctions
+
+
+def _cut_ring(ring: List[Point], junctions: set) -> List[List[Point]]:
+    """在交汇点处切分闭合环；无交汇点时旋转到固定起点，使相同的环可以去重"""
+    n = len(ring) - 1
+    points = ring[:n]
+    cuts = [i for i, p in enumerate(points) if p in junctions]
+    if not cuts:
+        start = min(range(n), key=points.__getitem__)
+        rotated = points[start:] + points[:start]
+        return [rotated + [rotated[0]]]
+
+    rotated = points[cuts[0]:] + points[:cuts[0]]
+    offsets = [c - cuts[0] for c in cuts] + [n]
+    rotated.append(rotated[0])
+    return [rotated[offsets[i]:offsets[i + 1] + 1] for i in range(len(offsets) - 1)]
+
+
+def _delta_encode(arc: List[Point]) -> List[List[int]]:
+    encoded = [list(arc[0])]
+    for (px, py), (x, y) in zip(arc, arc[1:]):
+        encoded.append([x - px, y - py])
+    return encoded
@@ -1,4 +1,4 @@
-from cerberus import Validator
+from .fast_validator import FastValidator
 from typing import Tuple, Dict, Any
 from .api_response import APIResponse
 
@@ -13,7 +13,7 @@ class RequestValidator:
         :param input_data: 输入数据
         :return: (是否验证通过, 验证结果或错误信息)
         """
-        validator = Validator(schema)
+        validator = FastValidator(schema)
         if not validator.validate(input_data):
             return False, validator.errors
         return True, validator.normalized(input_data)
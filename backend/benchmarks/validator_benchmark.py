@@ -0,0 +1,91 @@
+"""
+country_schema 校验性能对比：cerberus.Validator vs 编译后的 FastValidator
+
+用法（在 backend 目录下运行，缺少的 Shapefile 会自动下载到缓存目录）:
+    python -m benchmarks.validator_benchmark
+    python -m benchmarks.validator_benchmark --resolutions 110m 10m --repeat 3
+"""
+import argparse
+import time
+from cerberus import Validator
+from app.schemas.country import country_schema
+from app.services.naturalearth import NaturalEarthSource
+from app.utils.fast_validator import FastValidator
+
+
+def build_payloads(resolution: str) -> list:
+    """用Natural Earth边界数据构造完整的国家响应数据"""
+    source = NaturalEarthSource()
+    try:
+        collection = source.fetch_data(resolution=resolution)
+    finally:
+        source.close()
+
+    payloads = []
+    for feature in collection.get("features", []):
+        props = feature["properties"]
+        payloads.append({
+            "id": props.get("iso_a2") or "XX",
+            "name": props.get("name") or "Unknown",
+            "population": int(props.get("population") or 0),
+            "capital": "Capital",
+            "location": {"type": "Point", "coordinates": [0.0, 0.0]},
+            "geoJson": {"type": "FeatureCollection", "features": [feature]},
+            "storySeed": {
+                "demographics": {"gender_ratio": 0.5, "urban_ratio": 0.6, "median_age": 30},
+                "education": None,
+                "environment": {"gdp_per_capita": 1000.0, "internet_penetration": 0.5, "main_industries": []},
+                "milestones": None,
+                "historicalEvents": []
+            }
+        })
+    return payloads
+
+
+def run(validator_factory, payloads: list, repeat: int) -> tuple:
+    """返回 (最佳耗时秒数, 各数据的校验结果)"""
+    best, results = None, None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        current = []
+        for payload in payloads:
+            validator = validator_factory(country_schema)
+            ok = validator.validate(payload)
+            if ok:
+                validator.normalized(payload)
+            current.append(ok)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+        results = current
+    return best, results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--resolutions", nargs="+", default=["110m", "10m"])
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    print(f"{'resolution':<12}{'countries':>10}{'vertices':>12}{'cerberus(s)':>14}{'fast(s)':>10}{'speedup':>10}")
+    for resolution in args.resolutions:
+        payloads = build_payloads(resolution)
+        if not payloads:
+            print(f"{resolution:<12} no data")
+            continue
+        vertices = sum(
+            len(ring)
+            for p in payloads
+            for geom in [p["geoJson"]["features"][0]["geometry"]]
+            for poly in (geom["coordinates"] if geom["type"] == "MultiPolygon" else [geom["coordinates"]])
+            for ring in poly
+        )
+        slow, slow_results = run(Validator, payloads, args.repeat)
+        fast, fast_results = run(FastValidator, payloads, args.repeat)
+        if slow_results != fast_results:
+            mismatched = [p["id"] for p, a, b in zip(payloads, slow_results, fast_results) if a != b]
+            print(f"WARNING: results differ for {mismatched}")
+        print(f"{resolution:<12}{len(payloads):>10}{vertices:>12}{slow:>14.3f}{fast:>10.3f}{slow / fast:>9.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,156 @@
+"""country geometry as WKB; read model, neighbor and world topology tables
+
+从基线表结构升级：
+- country_geojson：coordinates(JSONB) 回填为 geometry_wkb 等各精细度的WKB列与 properties 后删除
+- 新增由数据更新生成的表：country_read_model、country_neighbors、world_topology
+  （已存在但结构与当前不一致的直接重建，其中的数据会在下次更新时重新生成）
+升级后需运行一次全量数据更新（GET /api/update）生成读模型、邻接关系与世界拓扑
+
+Revision ID: 5c1e7a93d2b4
+Revises:
+Create Date: 2026-10-18 05:30:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+from app.config import Config
+from app.utils.geometry import decode_wkb, encode_wkb_variants
+
+
+# revision identifiers, used by Alembic.
+revision = '5c1e7a93d2b4'
+down_revision = None
+branch_labels = None
+depends_on = None
+
+WKB_COLUMNS = ('geometry_wkb', 'geometry_wkb_medium', 'geometry_wkb_low')
+
+country_geojson = sa.table(
+    'country_geojson',
+    sa.column('id', sa.Integer),
+    sa.column('coordinates', postgresql.JSONB),
+    sa.column('geometry_wkb', sa.LargeBinary),
+    sa.column('geometry_wkb_medium', sa.LargeBinary),
+    sa.column('geometry_wkb_low', sa.LargeBinary),
+    sa.column('properties', postgresql.JSONB),
+)
+
+
+def _derived_tables():
+    """数据更新时生成的表（与 app.models 中的定义一致）"""
+    metadata = sa.MetaData()
+    sa.Table('countries', metadata, sa.Column('id', sa.String(2), primary_key=True))
+
+    def country_fk(**kwargs):
+        return sa.Column('country_id', sa.String(2), sa.ForeignKey('countries.id', ondelete='CASCADE'), **kwargs)
+
+    return [
+        sa.Table(
+            'country_read_model', metadata,
+            country_fk(primary_key=True),
+            sa.Column('payload', postgresql.JSONB(), nullable=False),
+            sa.Column('geo_wkb', sa.LargeBinary()),
+            sa.Column('geo_wkb_medium', sa.LargeBinary()),
+            sa.Column('geo_wkb_low', sa.LargeBinary()),
+            sa.Column('geo_properties', postgresql.JSONB()),
+            sa.Column('topo_json', postgresql.JSONB()),
+            sa.Column('story_seed', postgresql.JSONB()),
+            sa.Column('schema_version', sa.Integer()),
+            sa.Column('validated_at', sa.DateTime()),
+            sa.Column('updated_at', sa.DateTime()),
+        ),
+        sa.Table(
+            'country_neighbors', metadata,
+            country_fk(primary_key=True),
+            sa.Column('neighbor_id', sa.String(2), sa.ForeignKey('countries.id', ondelete='CASCADE'), primary_key=True),
+        ),
+        sa.Table(
+            'world_topology', metadata,
+            sa.Column('detail', sa.String(10), primary_key=True),
+            sa.Column('topology', postgresql.JSONB(), nullable=False),
+            sa.Column('country_count', sa.Integer()),
+            sa.Column('updated_at', sa.DateTime()),
+        ),
+    ]
+
+
+def _feature(coordinates):
+    """基线写入的是只含一个Feature的FeatureCollection；也兼容直接存储的Feature或geometry"""
+    if not isinstance(coordinates, dict):
+        return None
+    if coordinates.get('type') == 'FeatureCollection':
+        features = coordinates.get('features') or []
+        return features[0] if features else None
+    if coordinates.get('type') == 'Feature':
+        return coordinates
+    return {'type': 'Feature', 'properties': {}, 'geometry': coordinates}
+
+
+def _backfill_wkb(bind):
+    """由原JSONB坐标编码各精细度的WKB（坐标精度与数据更新时一致），无法解析的行保持为空"""
+    rows = bind.execute(
+        sa.select(country_geojson.c.id, country_geojson.c.coordinates).where(country_geojson.c.geometry_wkb.is_(None))
+    ).all()
+    failed = 0
+    for row_id, coordinates in rows:
+        feature = _feature(coordinates)
+        try:
+            variants = encode_wkb_variants(feature['geometry'], Config.GEOMETRY_PRECISION)
+        except Exception:
+            failed += 1
+            continue
+        bind.execute(country_geojson.update().where(country_geojson.c.id == row_id).values(
+            geometry_wkb=variants['full'],
+            geometry_wkb_medium=variants['medium'],
+            geometry_wkb_low=variants['low'],
+            properties=feature.get('properties') or {},
+        ))
+    print(f"Backfilled WKB for {len(rows) - failed} country_geojson rows, {failed} without a usable geometry")
+
+
+def upgrade():
+    bind = op.get_bind()
+    inspector = sa.inspect(bind)
+    columns = {column['name'] for column in inspector.get_columns('country_geojson')}
+
+    # 1. WKB与属性列，由原坐标回填；没有可用几何的行删除，下次数据更新时重新写入
+    for name in WKB_COLUMNS:
+        if name not in columns:
+            op.add_column('country_geojson', sa.Column(name, sa.LargeBinary()))
+    if 'properties' not in columns:
+        op.add_column('country_geojson', sa.Column('properties', postgresql.JSONB()))
+    if 'coordinates' in columns:
+        _backfill_wkb(bind)
+    op.execute("DELETE FROM country_geojson WHERE geometry_wkb IS NULL")
+    op.alter_column('country_geojson', 'geometry_wkb', nullable=False)
+    for name in ('coordinates', 'coordinates_medium', 'coordinates_low'):
+        if name in columns:
+            op.drop_column('country_geojson', name)
+
+    # 2. 派生表：不存在时创建，结构不一致时重建
+    for table in _derived_tables():
+        if inspector.has_table(table.name):
+            if {column['name'] for column in inspector.get_columns(table.name)} == set(table.c.keys()):
+                continue
+            table.drop(bind)
+        table.create(bind)
+
+
+def downgrade():
+    bind = op.get_bind()
+    for table in reversed(_derived_tables()):
+        table.drop(bind, checkfirst=True)
+
+    op.add_column('country_geojson', sa.Column('coordinates', postgresql.JSONB()))
+    rows = bind.execute(
+        sa.select(country_geojson.c.id, country_geojson.c.geometry_wkb, country_geojson.c.properties)
+    ).all()
+    for row_id, wkb, properties in rows:
+        feature = {'type': 'Feature', 'properties': properties or {}, 'geometry': decode_wkb(wkb)}
+        bind.execute(country_geojson.update().where(country_geojson.c.id == row_id).values(
+            coordinates={'type': 'FeatureCollection', 'features': [feature]}
+        ))
+    op.alter_column('country_geojson', 'coordinates', nullable=False)
+    for name in (*WKB_COLUMNS, 'properties'):
+        op.drop_column('country_geojson', name)
@@ -0,0 +1,37 @@
+"""one country_geojson row per country
+
+- 每个国家只保留最后写入（id最大）的一行
+- 在 country_id 上建唯一索引（批量写入的 ON CONFLICT 目标）
+
+Revision ID: 8e4b2f61a0c7
+Revises: 5c1e7a93d2b4
+Create Date: 2026-10-18 05:30:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '8e4b2f61a0c7'
+down_revision = '5c1e7a93d2b4'
+branch_labels = None
+depends_on = None
+
+GEOJSON_UNIQUE = 'country_geojson_country_id_key'
+
+
+def upgrade():
+    op.execute(
+        "DELETE FROM country_geojson a USING country_geojson b "
+        "WHERE a.country_id = b.country_id AND a.id < b.id"
+    )
+
+    inspector = sa.inspect(op.get_bind())
+    unique_columns = [constraint['column_names'] for constraint in inspector.get_unique_constraints('country_geojson')]
+    if ['country_id'] not in unique_columns:
+        op.create_unique_constraint(GEOJSON_UNIQUE, 'country_geojson', ['country_id'])
+
+
+def downgrade():
+    op.drop_constraint(GEOJSON_UNIQUE, 'country_geojson', type_='unique')
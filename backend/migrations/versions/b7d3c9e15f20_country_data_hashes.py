@@ -0,0 +1,33 @@
+"""country data content hashes
+
+新增 country_data_hashes：各数据源内容的哈希，批量更新时跳过内容未变化的数据源
+（表为空时下一次更新会写入全部数据并生成哈希）
+
+Revision ID: b7d3c9e15f20
+Revises: 8e4b2f61a0c7
+Create Date: 2026-10-18 05:40:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'b7d3c9e15f20'
+down_revision = '8e4b2f61a0c7'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        'country_data_hashes',
+        sa.Column('country_id', sa.String(2), sa.ForeignKey('countries.id', ondelete='CASCADE'), primary_key=True),
+        sa.Column('base', sa.String(64)),
+        sa.Column('worldbank', sa.String(64)),
+        sa.Column('geometry', sa.String(64)),
+    )
+
+
+def downgrade():
+    op.drop_table('country_data_hashes')
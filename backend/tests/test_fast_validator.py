@@ -0,0 +1,114 @@
+"""
+FastValidator 与 cerberus 的等价性：对合法文档做随机变异，
+两者的 validate() 结果、errors 与 normalized() 必须完全一致
+"""
+import copy
+import random
+import pytest
+from cerberus import Validator
+from app.schemas.country import country_schema
+from app.utils.fast_validator import FastValidator
+
+# 变异时替换进文档的值，覆盖各类型、边界值与空值
+REPLACEMENTS = [
+    None, True, False, 0, -1, 1, 200, 0.5, -0.1, 1.5, -181.0, 181.0, -91.0, 91.0,
+    "", "x", "Point", "Feature", "Polygon", [], [0.0], [0.0, 0.0], [0.0, 0.0, 0.0], ["a", 1.0], {}, {"x": 1},
+]
+
+
+def _ring(n: int, lon: float = 10.0, lat: float = 20.0) -> list:
+    """n个点的闭合环（n达到16时走NumPy批量校验）"""
+    points = [[lon + (i % 4) * 0.5, lat + (i // 4) * 0.5] for i in range(n - 1)]
+    return points + [points[0]]
+
+
+def _base_documents() -> list:
+    polygon = {"type": "Polygon", "coordinates": [_ring(5)]}
+    multipolygon = {"type": "MultiPolygon", "coordinates": [[_ring(20)], [_ring(4, -10.0, -20.0)]]}
+    documents = []
+    for geometry in (polygon, multipolygon):
+        documents.append({
+            "id": "CN",
+            "name": "China",
+            "population": 1400000000,
+            "capital": "Beijing",
+            "location": {"type": "Point", "coordinates": [116.4, 39.9]},
+            "geoJson": {"type": "FeatureCollection", "features": [
+                {"type": "Feature", "properties": {"name": "China"}, "geometry": geometry}
+            ]},
+            "storySeed": {
+                "demographics": {"urban_ratio": 0.6, "median_age": 38},
+                "education": None,
+                "environment": {"gdp_per_capita": 12000.5, "internet_penetration": 0.7, "main_industries": ["steel"]},
+                "milestones": {"avg_marriage_age": 28, "avg_first_child_age": 29, "life_expectancy": 78},
+                "historicalEvents": [{"name": "event", "year": 1949, "impact": "political"}]
+            }
+        })
+    return documents
+
+
+def _paths(value, prefix=()):
+    """文档中所有可变异的位置（字典键与列表下标）"""
+    if isinstance(value, dict):
+        items = value.items()
+    elif isinstance(value, list):
+        items = enumerate(value)
+    else:
+        return
+    for key, child in items:
+        yield prefix + (key,)
+        yield from _paths(child, prefix + (key,))
+
+
+def _mutate(document: dict, rng: random.Random) -> dict:
+    """随机替换、删除或新增1~3处"""
+    document = copy.deepcopy(document)
+    for _ in range(rng.randint(1, 3)):
+        path = rng.choice(list(_paths(document)))
+        parent = document
+        for key in path[:-1]:
+            parent = parent[key]
+        action = rng.random()
+        if action < 0.6:
+            parent[path[-1]] = copy.deepcopy(rng.choice(REPLACEMENTS))
+        elif action < 0.85:
+            del parent[path[-1]]
+        elif isinstance(parent, dict):
+            parent["unknown"] = 1
+        else:
+            parent.append(copy.deepcopy(rng.choice(REPLACEMENTS)))
+    return document
+
+
+# 两个校验器都可重复使用（构造时编译/规范化schema的开销较大）
+reference = Validator(country_schema)
+fast = FastValidator(country_schema)
+
+
+def _assert_equivalent(document: dict):
+    expected = reference.validate(copy.deepcopy(document))
+    assert fast.validate(copy.deepcopy(document)) == expected
+    if expected:
+        assert fast.normalized(copy.deepcopy(document)) == reference.normalized(copy.deepcopy(document))
+    else:
+        assert fast.errors == reference.errors
+
+
+@pytest.mark.parametrize("document", _base_documents())
+def test_valid_documents_match_cerberus(document):
+    _assert_equivalent(document)
+
+
+@pytest.mark.parametrize("seed", range(10))
+def test_mutated_documents_match_cerberus(seed):
+    rng = random.Random(seed)
+    documents = _base_documents()
+    for _ in range(50):
+        _assert_equivalent(_mutate(rng.choice(documents), rng))
+
+
+def test_validate_does_not_modify_document():
+    document = _base_documents()[0]
+    original = copy.deepcopy(document)
+    fast.validate(document)
+    assert document == original